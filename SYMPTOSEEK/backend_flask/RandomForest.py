@@ -1,59 +1,323 @@
-import pandas as pd
-import numpy as np
-import warnings
-import joblib
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import GridSearchCV
-from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import accuracy_score, classification_report
-
-warnings.filterwarnings('ignore')
-
-def summary_report(y_true, y_pred, prefix=""):
-    acc = accuracy_score(y_true, y_pred)
-    report = classification_report(y_true, y_pred, output_dict=True, zero_division=0)
-    print(f"\n✅ {prefix} Accuracy: {acc:.3f}")
-    print(f"{prefix} Classification Report (summary):")
-    print("   Macro avg    | Precision: {:.2f}  Recall: {:.2f}  F1: {:.2f}".format(
-        report['macro avg']['precision'], report['macro avg']['recall'], report['macro avg']['f1-score']))
-    print("Weighted avg | Precision: {:.2f}  Recall: {:.2f}  F1: {:.2f}\n".format(
-        report['weighted avg']['precision'], report['weighted avg']['recall'], report['weighted avg']['f1-score']))
-
-# Load data
-train = pd.read_csv('data/Training.csv')
-test = pd.read_csv('data/Testing.csv')
-
-X_train = train.drop('prognosis', axis=1)
-y_train = train['prognosis']
-X_test = test.drop('prognosis', axis=1)
-y_test = test['prognosis']
-
-le = LabelEncoder()
-y_train_enc = le.fit_transform(y_train)
-y_test_enc = le.transform(y_test)
-
-# Automatically determine cv splits
-class_counts = pd.Series(y_train_enc).value_counts()
-min_class_count = class_counts.min()
-cv_splits = min(5, min_class_count)
-
-# GridSearchCV for Random Forest
-param_grid = {
-    'n_estimators': [50, 100, 200],
-    'max_depth': [5, 10, 20, None],
-    'min_samples_leaf': [1, 3, 5],
-    'max_features': ['sqrt', 'log2']
-}
-rf_base = RandomForestClassifier(random_state=42)
-grid = GridSearchCV(rf_base, param_grid, cv=cv_splits, scoring='accuracy', n_jobs=-1)
-grid.fit(X_train, y_train_enc)
-best_rf = grid.best_estimator_
-
-# Evaluate on train and test set
-y_pred_train = best_rf.predict(X_train)
-y_pred_test = best_rf.predict(X_test)
-summary_report(y_train_enc, y_pred_train, prefix="Train ")
-summary_report(y_test_enc, y_pred_test, prefix="Test ")
-
-joblib.dump(best_rf, "best_rf_model.joblib")
-joblib.dump(le, "label_encoder.joblib")
+import argparse
+import hashlib
+import json
+import math
+import os
+import pickle
+import time
+import pandas as pd
+import numpy as np
+import warnings
+import joblib
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import ParameterGrid, ParameterSampler, StratifiedKFold
+from sklearn.preprocessing import LabelEncoder
+from sklearn.metrics import accuracy_score, classification_report
+from forest_engine import export_forest
+from model_registry import ModelRegistry
+
+warnings.filterwarnings('ignore')
+
+PARAM_GRID = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [5, 10, 20, None],
+    'min_samples_leaf': [1, 3, 5],
+    'max_features': ['sqrt', 'log2']
+}
+RANDOM_STATE = 42
+
+def summary_report(y_true, y_pred, prefix=""):
+    acc = accuracy_score(y_true, y_pred)
+    report = classification_report(y_true, y_pred, output_dict=True, zero_division=0)
+    print(f"\n✅ {prefix} Accuracy: {acc:.3f}")
+    print(f"{prefix} Classification Report (summary):")
+    print("   Macro avg    | Precision: {:.2f}  Recall: {:.2f}  F1: {:.2f}".format(
+        report['macro avg']['precision'], report['macro avg']['recall'], report['macro avg']['f1-score']))
+    print("Weighted avg | Precision: {:.2f}  Recall: {:.2f}  F1: {:.2f}\n".format(
+        report['weighted avg']['precision'], report['weighted avg']['recall'], report['weighted avg']['f1-score']))
+    return acc
+
+def data_fingerprint(X, y):
+    """Stable hash of the training matrix, labels and column names"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(list(map(str, X.columns))).encode())
+    digest.update(np.ascontiguousarray(X.to_numpy()).tobytes())
+    digest.update(np.ascontiguousarray(y).tobytes())
+    return digest.hexdigest()
+
+def family_key(params):
+    """Candidate parameters without ``n_estimators`` (forests that can grow into each other)"""
+    return tuple(sorted((k, v) for k, v in params.items() if k != 'n_estimators'))
+
+class ResultsCache:
+    """Cross-validation results persisted as JSON, keyed by data hash, CV setup and params"""
+
+    def __init__(self, path):
+        self.path = path
+        self.results = {}
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.results = json.load(f)
+
+    def key(self, data_hash, params, cv_splits):
+        payload = json.dumps({'data': data_hash, 'params': params, 'cv': cv_splits, 'seed': RANDOM_STATE}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key):
+        return self.results.get(key)
+
+    def put(self, key, result):
+        self.results[key] = result
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.results, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+def single_row_latency_ms(model, X, repeat=20):
+    """Median wall time of one single-row ``predict_proba`` call"""
+    row = X[:1]
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.predict_proba(row)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1000)
+
+class FamilySearch:
+    """Evaluates candidates by CV, growing each parameter family's fold models with warm start.
+
+    Candidates that differ only in ``n_estimators`` share fold models: going
+    from 50 to 100 trees fits 50 new trees instead of 100. Results already in
+    the cache are returned without fitting anything. Fold models are only
+    kept while a family can still grow; :meth:`release` drops them once a
+    family is finished or eliminated, so memory holds the live families only.
+    """
+
+    def __init__(self, X, y, cv_splits, cache, data_hash, n_jobs=-1):
+        self.X, self.y = X, y
+        self.folds = list(StratifiedKFold(cv_splits, shuffle=True, random_state=RANDOM_STATE).split(X, y))
+        self.cv_splits = cv_splits
+        self.cache = cache
+        self.data_hash = data_hash
+        self.n_jobs = n_jobs
+        self._fold_models = {}
+
+    def _grow(self, params, n_estimators):
+        """Fit (or extend) the fold models of ``params``'s family to ``n_estimators`` trees"""
+        family = family_key(params)
+        models = self._fold_models.get(family)
+        if models is None or models[0].n_estimators > n_estimators:
+            base = {k: v for k, v in params.items() if k != 'n_estimators'}
+            models = [RandomForestClassifier(random_state=RANDOM_STATE, warm_start=True, n_jobs=self.n_jobs, **base)
+                      for _ in self.folds]
+            self._fold_models[family] = models
+
+        scores = []
+        start = time.perf_counter()
+        for model, (train_idx, val_idx) in zip(models, self.folds):
+            model.set_params(n_estimators=n_estimators)
+            model.fit(self.X.iloc[train_idx], self.y[train_idx])
+            scores.append(accuracy_score(self.y[val_idx], model.predict(self.X.iloc[val_idx])))
+        return models, scores, time.perf_counter() - start
+
+    def release(self, params):
+        """Drop the fold models of ``params``'s family; it will not be grown again"""
+        self._fold_models.pop(family_key(params), None)
+
+    def evaluate(self, params):
+        key = self.cache.key(self.data_hash, params, self.cv_splits)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return dict(cached, cached=True)
+
+        models, scores, fit_seconds = self._grow(params, params['n_estimators'])
+        model = models[0]
+        model.set_params(n_jobs=None)
+        result = {
+            'params': params,
+            'cv_accuracy': float(np.mean(scores)),
+            'cv_std': float(np.std(scores)),
+            'fit_seconds': round(fit_seconds, 3),
+            'model_size_bytes': len(pickle.dumps(model)),
+            'n_nodes': int(sum(tree.tree_.node_count for tree in model.estimators_)),
+            'max_depth': int(max(tree.tree_.max_depth for tree in model.estimators_)),
+            'predict_ms': round(single_row_latency_ms(model, self.X.iloc[:1]), 3),
+        }
+        model.set_params(n_jobs=self.n_jobs)
+        self.cache.put(key, result)
+        self.cache.save()
+        return dict(result, cached=False)
+
+    def evaluate_all(self, candidates):
+        """Evaluate candidates family by family, in increasing ``n_estimators`` order"""
+        ordered = sorted(candidates, key=lambda p: (repr(family_key(p)), p['n_estimators']))
+        results = []
+        for i, params in enumerate(ordered):
+            results.append(self.evaluate(params))
+            if i + 1 == len(ordered) or family_key(ordered[i + 1]) != family_key(params):
+                self.release(params)  # the family reached its largest size
+        return results
+
+def log_result(result):
+    params = ', '.join(f"{k}={v}" for k, v in sorted(result['params'].items()))
+    source = 'cached' if result['cached'] else f"{result['fit_seconds']:.1f}s"
+    print(f"   {result['cv_accuracy']:.3f} ± {result['cv_std']:.3f} | {result['predict_ms']:.2f} ms | "
+          f"{result['model_size_bytes'] / 1e6:.1f} MB | {source} | {params}")
+
+def run_search(search, args):
+    """Run the chosen strategy; returns every evaluated candidate result"""
+    grid = list(ParameterGrid(PARAM_GRID))
+    if args.search == 'grid' or (args.search == 'random' and not 0 < args.n_iter < len(grid)):
+        candidates = grid
+    elif args.search == 'random':
+        candidates = list(ParameterSampler(PARAM_GRID, n_iter=args.n_iter, random_state=RANDOM_STATE))
+    else:
+        return successive_halving(search, args)
+
+    print(f"🔎 Evaluating {len(candidates)} candidates ({args.search} search)")
+    results = search.evaluate_all(candidates)
+    for result in results:
+        log_result(result)
+    return results
+
+def successive_halving(search, args):
+    """Successive halving with the number of trees as the resource.
+
+    Every family starts at ``min_estimators`` trees; after each round only the
+    best ``1/eta`` survive and are warm-started to ``eta`` times more trees,
+    up to ``max_estimators``.
+    """
+    families = {family_key(p): {k: v for k, v in p.items() if k != 'n_estimators'}
+                for p in ParameterGrid(PARAM_GRID)}
+    survivors = list(families.values())
+    if args.n_iter and args.n_iter < len(survivors):
+        rng = np.random.default_rng(RANDOM_STATE)
+        survivors = [survivors[i] for i in rng.choice(len(survivors), args.n_iter, replace=False)]
+
+    results = []
+    n_estimators = args.min_estimators
+    while True:
+        print(f"🔎 Halving round: {len(survivors)} candidates at {n_estimators} trees")
+        round_results = [search.evaluate(dict(params, n_estimators=n_estimators)) for params in survivors]
+        for result in round_results:
+            log_result(result)
+        results += round_results
+        if n_estimators >= args.max_estimators or len(survivors) == 1:
+            for params in survivors:
+                search.release(params)
+            return results
+        keep = max(1, math.ceil(len(survivors) / args.eta))
+        ranked = sorted(zip(round_results, survivors), key=lambda pair: -pair[0]['cv_accuracy'])
+        for _, params in ranked[keep:]:
+            search.release(params)  # eliminated families are never warm-started again
+        survivors = [params for _, params in ranked[:keep]]
+        n_estimators = min(n_estimators * args.eta, args.max_estimators)
+
+def select_best(results, max_predict_ms=None):
+    """Most accurate candidate (within the latency budget if given); ties go to the faster one"""
+    eligible = [r for r in results if max_predict_ms is None or r['predict_ms'] <= max_predict_ms]
+    if not eligible:
+        print(f"⚠️ No candidate under {max_predict_ms} ms; ignoring the latency budget")
+        eligible = results
+    return max(eligible, key=lambda r: (round(r['cv_accuracy'], 6), -r['predict_ms']))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the symptom Random Forest with a cached hyperparameter search")
+    parser.add_argument('--train', default='data/Training.csv')
+    parser.add_argument('--test', default='data/Testing.csv')
+    parser.add_argument('--output-dir', default='models', help="where the model, label encoder and forest export go")
+    parser.add_argument('--search', choices=['halving', 'random', 'grid'], default='halving')
+    parser.add_argument('--n-iter', type=int, default=20, help="candidates sampled by random search / halving (0 = all)")
+    parser.add_argument('--min-estimators', type=int, default=25)
+    parser.add_argument('--max-estimators', type=int, default=200)
+    parser.add_argument('--eta', type=int, default=3)
+    parser.add_argument('--max-predict-ms', type=float, default=None, help="latency budget when picking the winner")
+    parser.add_argument('--cache', default='models/search_cache.json')
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--report', default=None, help="JSON report path (default: <output-dir>/search_report.json)")
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--publish', action='store_true', help="also publish the model as a new registry version")
+    parser.add_argument('--registry', default='models/registry')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    started = time.perf_counter()
+
+    # Load data
+    train = pd.read_csv(args.train)
+    test = pd.read_csv(args.test)
+
+    X_train = train.drop('prognosis', axis=1)
+    y_train = train['prognosis']
+    X_test = test.drop('prognosis', axis=1)
+    y_test = test['prognosis']
+
+    le = LabelEncoder()
+    y_train_enc = le.fit_transform(y_train)
+    y_test_enc = le.transform(y_test)
+
+    # Automatically determine cv splits
+    class_counts = pd.Series(y_train_enc).value_counts()
+    min_class_count = class_counts.min()
+    cv_splits = int(min(5, min_class_count))
+
+    data_hash = data_fingerprint(X_train, y_train_enc)
+    cache = ResultsCache(None if args.no_cache else args.cache)
+    search = FamilySearch(X_train, y_train_enc, cv_splits, cache, data_hash, n_jobs=args.n_jobs)
+    results = run_search(search, args)
+    best = select_best(results, args.max_predict_ms)
+    print(f"🏆 Best: {best['params']} (CV accuracy {best['cv_accuracy']:.3f}, {best['predict_ms']:.2f} ms)")
+
+    best_rf = RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=args.n_jobs, **best['params'])
+    fit_start = time.perf_counter()
+    best_rf.fit(X_train, y_train_enc)
+    final_fit_seconds = time.perf_counter() - fit_start
+    best_rf.set_params(n_jobs=None)
+
+    # Evaluate on train and test set
+    y_pred_train = best_rf.predict(X_train)
+    y_pred_test = best_rf.predict(X_test)
+    summary_report(y_train_enc, y_pred_train, prefix="Train ")
+    test_accuracy = summary_report(y_test_enc, y_pred_test, prefix="Test ")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    joblib.dump(best_rf, os.path.join(args.output_dir, "best_rf_model.joblib"))
+    joblib.dump(le, os.path.join(args.output_dir, "label_encoder.joblib"))
+    # Flat node arrays the API memory-maps instead of unpickling the forest
+    export_forest(best_rf, os.path.join(args.output_dir, "forest"))
+
+    report = {
+        'data_hash': data_hash,
+        'search': args.search,
+        'cv_splits': cv_splits,
+        'candidates': results,
+        'evaluated': sum(not r['cached'] for r in results),
+        'cached': sum(r['cached'] for r in results),
+        'best': best,
+        'final_fit_seconds': round(final_fit_seconds, 3),
+        'test_accuracy': float(test_accuracy),
+        'total_seconds': round(time.perf_counter() - started, 3),
+    }
+    if args.publish:
+        report['version'] = ModelRegistry(args.registry).publish(best_rf, le, {
+            'source': 'RandomForest.py',
+            'data_hash': data_hash,
+            'params': best['params'],
+            'metrics': {'cv_accuracy': best['cv_accuracy'], 'test_accuracy': float(test_accuracy),
+                        'predict_ms': best['predict_ms']},
+        })
+
+    report_path = args.report or os.path.join(args.output_dir, 'search_report.json')
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"📝 Search report written to {report_path} ({report['evaluated']} fitted, {report['cached']} from cache)")
+    return report
+
+if __name__ == '__main__':
+    main()
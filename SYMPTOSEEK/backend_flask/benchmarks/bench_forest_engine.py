@@ -0,0 +1,67 @@
+"""Compare ForestEngine with RandomForestClassifier.predict_proba.
+
+Run from backend_flask after training (and exporting) a model:
+
+    python benchmarks/bench_forest_engine.py [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from forest_engine import ForestEngine, artifact_exists, export_forest  # noqa: E402
+
+warnings.filterwarnings('ignore')
+BATCH_SIZES = (1, 100, 10000)
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default='models/best_rf_model.joblib')
+    parser.add_argument('--forest', default='models/forest')
+    parser.add_argument('--data', default='data/Testing.csv')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    forest_dir = args.forest
+    if not artifact_exists(forest_dir):
+        forest_dir = tempfile.mkdtemp(prefix='forest-')
+        export_forest(model, forest_dir)
+    engine = ForestEngine.load(forest_dir)
+
+    X = pd.read_csv(args.data).drop(columns='prognosis').to_numpy(dtype=np.float32)
+    rng = np.random.default_rng(0)
+
+    print(f"{'batch':>7} {'sklearn ms':>11} {'engine ms':>10} {'speedup':>8} {'max |diff|':>11}")
+    for size in BATCH_SIZES:
+        batch = X[rng.integers(0, len(X), size)]
+        expected, actual = model.predict_proba(batch), engine.predict_proba(batch)
+        sklearn_s = best_of(lambda: model.predict_proba(batch), args.repeat)
+        engine_s = best_of(lambda: engine.predict_proba(batch), args.repeat)
+        print(f"{size:>7} {sklearn_s * 1000:>11.2f} {engine_s * 1000:>10.2f} {sklearn_s / engine_s:>7.1f}x "
+              f"{np.abs(expected - actual).max():>11.1e}")
+
+    indices = np.flatnonzero(X[0])
+    single_s = best_of(lambda: engine.predict_proba_indices(indices), args.repeat * 20)
+    print(f"single row from symptom indices: {single_s * 1e6:.0f} µs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Compare IntentRouter with the keyword cascade chat_api used before it.
+
+Run from backend_flask:
+
+    python benchmarks/bench_intents.py [--repeat 5] [--messages 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from intents import IntentRouter, normalize_message  # noqa: E402
+
+SAMPLE_MESSAGES = [
+    'hi', 'hello there', 'good morning doctor', 'help', 'how does this work?',
+    'thank you so much', 'that was really helpful', 'reset', 'start over', 'no', 'nope',
+    "that's all", 'done', 'i think that is all for now', 'no more symptoms',
+    'I have chest pain and my left arm hurts', 'this is urgent', "I can't breathe properly",
+    'I have a headache and feel nauseous', 'my throat is sore and I have been coughing for three days',
+    'I feel dizzy and tired all the time', 'there is a rash on my hip that itches',
+    'this fever started yesterday with chills', 'my stomach hurts after eating spicy food',
+]
+
+
+def legacy_classify(user_message):
+    """The pre-IntentRouter cascade: substring scans rebuilt on every call"""
+    greetings = ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening', 'greetings', 'start']
+    if any(greeting in user_message for greeting in greetings) and len(user_message) < 20:
+        return 'greeting'
+    help_keywords = ['help', 'how to use', 'instructions', 'guide', 'what can you do', 'how does this work']
+    if any(keyword in user_message for keyword in help_keywords):
+        return 'help'
+    thank_you_keywords = ['thank you', 'thanks', 'appreciate', 'helpful', 'great']
+    if any(keyword in user_message for keyword in thank_you_keywords):
+        return 'thanks'
+    if user_message in ['reset', 'start over', 'clear', 'restart']:
+        return 'reset'
+    emergency_keywords = ['emergency', 'urgent', 'severe pain', 'can\'t breathe', 'chest pain', 'heart attack', 'stroke']
+    if any(keyword in user_message for keyword in emergency_keywords):
+        return 'emergency'
+    completion_signals = ["that's all", "done", "no more", "that is all", "finish", "analyze", "complete"]
+    if any(signal in user_message for signal in completion_signals):
+        return 'completion'
+    if user_message in ['no', 'nope', 'none', 'no more symptoms']:
+        return 'negative'
+    return None
+
+
+def per_message_us(fn, messages, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for message in messages:
+            fn(message)
+        best = min(best, time.perf_counter() - start)
+    return best / len(messages) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--messages', type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    messages = [normalize_message(rng.choice(SAMPLE_MESSAGES)) for _ in range(args.messages)]
+    router = IntentRouter()
+
+    legacy_us = per_message_us(legacy_classify, messages, args.repeat)
+    router_us = per_message_us(router.classify, messages, args.repeat)
+    print(f"{'classifier':<14}{'us/message':>12}")
+    print(f"{'cascade':<14}{legacy_us:>12.2f}")
+    print(f"{'IntentRouter':<14}{router_us:>12.2f}  ({legacy_us / router_us:.1f}x)")
+
+    print("\nMessages classified differently (word boundaries and priority order):")
+    for message in SAMPLE_MESSAGES:
+        message = normalize_message(message)
+        old, new = legacy_classify(message), router.classify(message)
+        if old != new:
+            print(f"  {message!r}: {old} -> {new}")
+
+
+if __name__ == '__main__':
+    main()
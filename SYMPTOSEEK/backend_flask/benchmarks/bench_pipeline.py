@@ -0,0 +1,133 @@
+"""Micro-benchmarks for each stage of the chat pipeline.
+
+Times symptom extraction, vector encoding, prediction, follow-up lookup,
+doctor search and history persistence on seeded synthetic inputs, using
+the same resources the app serves with. Run from backend_flask after
+training a model:
+
+    python benchmarks/bench_pipeline.py [--iterations 2000] [--rounds 3] [--only predict] [--output before.json]
+
+Compare two reports with ``python benchmarks/compare.py before.json after.json``.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime
+
+os.environ.setdefault('RESOURCE_WARMUP', 'lazy')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402
+from forest_engine import ForestEngine  # noqa: E402
+from history_store import JournalHistoryStore, SQLiteHistoryStore  # noqa: E402
+from report import best_round, print_results, time_calls, write_report  # noqa: E402
+
+MESSAGE_TEMPLATES = [
+    'i have {}',
+    'i have been having {} since yesterday',
+    'my main problems are {}',
+    'for two days now i have had {} and it is getting worse',
+]
+
+# Most doctors in the dataset are in and around Dhaka
+LAT_RANGE, LON_RANGE = (23.6, 23.9), (90.2, 90.5)
+
+
+def symptom_sets(features, rng, n):
+    return [rng.sample(features, rng.randint(1, 4)) for _ in range(n)]
+
+
+def messages_for(sets, rng):
+    messages = []
+    for symptoms in sets:
+        names = [s.replace('_', ' ') for s in symptoms]
+        listed = names[0] if len(names) == 1 else ', '.join(names[:-1]) + ' and ' + names[-1]
+        messages.append(rng.choice(MESSAGE_TEMPLATES).format(listed))
+    return messages
+
+
+def history_messages(n):
+    now = datetime.now().isoformat()
+    return [(f'chat-{i % 100}', {'text': f'message {i}', 'isUser': i % 2 == 0, 'timestamp': now, 'type': 'text'})
+            for i in range(n)]
+
+
+def bench_history(store_cls, filename, messages):
+    """Append latency on a fresh store in a throwaway directory"""
+    with tempfile.TemporaryDirectory(prefix='bench-history-') as tmp:
+        store = store_cls(os.path.join(tmp, filename))
+        try:
+            return time_calls(lambda item: store.add_message('bench_user', *item), messages)
+        finally:
+            store.close()
+
+
+def build_benchmarks(iterations, seed):
+    """Name -> zero-argument callable returning per-call latencies"""
+    rng = random.Random(seed)
+    resources = app.resources
+    encoder = resources['symptom_encoder']
+    bundle = resources['model_bundle']
+    features = list(encoder.features)
+
+    sets = symptom_sets(features, rng, iterations)
+    messages = messages_for(sets, rng)
+    extractor = resources['symptom_extractor']
+    symptom_index = resources['symptom_index']
+    doctor_index = resources['doctor_index']
+    specialties = sorted(set(app.disease_to_specialty.values()))
+    doctor_queries = [(rng.choice(specialties), rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE))
+                      for _ in range(iterations)]
+
+    if isinstance(bundle.model, ForestEngine):
+        def predict(symptoms):
+            return bundle.model.predict_proba_indices(encoder.indices(symptoms)[0])
+    else:
+        def predict(symptoms):
+            return bundle.model.predict_proba(encoder.encode(symptoms))
+
+    return {
+        'extract_symptoms': lambda: time_calls(extractor.extract, messages),
+        'encode_vector': lambda: time_calls(encoder.encode, sets),
+        'encode_indices': lambda: time_calls(encoder.indices, sets),
+        'predict': lambda: time_calls(predict, sets),
+        'related_symptoms': lambda: time_calls(
+            lambda symptoms: symptom_index.related(symptoms[-1], exclude=symptoms, k=3), sets),
+        'doctor_search': lambda: time_calls(
+            lambda query: doctor_index.nearest_for_specialty(*query, k=3), doctor_queries),
+        'history_append_journal': lambda: bench_history(
+            JournalHistoryStore, 'chat_history.json', history_messages(iterations)),
+        'history_append_sqlite': lambda: bench_history(
+            SQLiteHistoryStore, 'chat_history.db', history_messages(iterations)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=2000, help='timed calls per benchmark')
+    parser.add_argument('--rounds', type=int, default=3, help='runs per benchmark; the one with the lowest p50 is kept')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', action='append', help='run only these benchmarks (repeatable)')
+    parser.add_argument('--output', help='write a JSON report to this path')
+    args = parser.parse_args()
+
+    benchmarks = build_benchmarks(args.iterations, args.seed)
+    unknown = set(args.only or []) - set(benchmarks)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}; choose from {', '.join(benchmarks)}")
+
+    results = {name: best_round(run, args.rounds) for name, run in benchmarks.items()
+               if not args.only or name in args.only}
+    print_results(results)
+    if args.output:
+        config = {'iterations': args.iterations, 'rounds': args.rounds, 'seed': args.seed,
+                  'model': app.resources['model_bundle'].version,
+                  'engine': type(app.resources['model_bundle'].model).__name__}
+        write_report(args.output, 'pipeline', results, config)
+        print(f"📝 Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Diff two benchmark reports written by bench_pipeline.py or load_chat.py.
+
+    python benchmarks/compare.py before.json after.json [--metric p95_ms] [--threshold 0.1] [--fail-on-regression]
+
+A benchmark regresses when ``--metric`` (a latency percentile) grows by
+more than ``--threshold`` of the old value and by at least ``--min-delta-ms``,
+so microsecond-scale jitter is not reported.
+"""
+import argparse
+import json
+import sys
+
+LATENCY_METRICS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def change(old, new):
+    return (new - old) / old if old else None
+
+
+def format_change(old, new):
+    delta = change(old, new)
+    return f"{delta:+.1%}" if delta is not None else 'n/a'
+
+
+def compare(old_results, new_results, metric, threshold, min_delta_ms=0.0):
+    """Print one row per benchmark and return the names that regressed"""
+    regressions = []
+    print(f"{'benchmark':<28} " + ' '.join(f"{m:>22}" for m in LATENCY_METRICS) + f" {'ops/s':>16}")
+    for name in sorted(set(old_results) | set(new_results)):
+        if name not in old_results or name not in new_results:
+            print(f"{name:<28} only in {'new' if name in new_results else 'old'} report")
+            continue
+        old, new = old_results[name], new_results[name]
+        cells = [f"{old[m]:.3f}→{new[m]:.3f} {format_change(old[m], new[m]):>7}" for m in LATENCY_METRICS]
+        ops = format_change(old['ops_per_s'], new['ops_per_s']) if old['ops_per_s'] and new['ops_per_s'] else 'n/a'
+        delta = change(old[metric], new[metric])
+        regressed = delta is not None and delta > threshold and new[metric] - old[metric] >= min_delta_ms
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<28} " + ' '.join(f"{cell:>22}" for cell in cells) + f" {ops:>16}" + (" ⚠️" if regressed else ""))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--metric', default='p95_ms', choices=LATENCY_METRICS)
+    parser.add_argument('--threshold', type=float, default=0.1)
+    parser.add_argument('--min-delta-ms', type=float, default=0.01)
+    parser.add_argument('--fail-on-regression', action='store_true', help='exit with status 1 on any regression')
+    args = parser.parse_args()
+
+    old, new = load(args.old), load(args.new)
+    if old['suite'] != new['suite']:
+        parser.error(f"cannot compare a {old['suite']} report with a {new['suite']} report")
+    print(f"{old['environment']['commit']} ({args.old}) → {new['environment']['commit']} ({args.new})")
+    for key in ('platform', 'cpu_count', 'python'):
+        if old['environment'].get(key) != new['environment'].get(key):
+            print(f"⚠️ Reports differ in {key}: {old['environment'].get(key)} vs {new['environment'].get(key)}")
+    if old['config'] != new['config']:
+        print(f"⚠️ Reports were run with different settings: {old['config']} vs {new['config']}")
+
+    regressions = compare(old['results'], new['results'], args.metric, args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"⚠️ {len(regressions)} regressed by more than {args.threshold:.0%} on {args.metric}: {', '.join(regressions)}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""Load test: concurrent multi-turn conversations through /api/chat.
+
+Each conversation greets the bot, reports symptoms, adds one more when
+asked for follow-ups, declines further follow-ups, asks for the analysis
+with a location (so the doctor search runs) and says thanks. ``--users``
+threads play ``--conversations`` seeded conversations against the Flask
+test client, so the full request path runs in-process with no network in
+between. History and sessions go to a temporary directory, using the
+backends selected by CHAT_HISTORY_BACKEND and SESSION_BACKEND.
+
+    python benchmarks/load_chat.py [--users 8] [--conversations 500] [--stream] [--output load.json]
+
+Reports latency per turn, per request and per conversation, plus overall
+throughput; compare two reports with ``python benchmarks/compare.py``.
+The threads share the GIL, so tail percentiles vary from run to run while
+throughput and medians stay steady: diff load reports with
+``--metric p50_ms``, or run ``--users 1`` for steadier per-request latency.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault('RESOURCE_WARMUP', 'lazy')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402
+from history_store import create_history_store  # noqa: E402
+from session_store import create_session_store  # noqa: E402
+from report import print_results, summarize, write_report  # noqa: E402
+
+GREETINGS = ['hi', 'hello', 'good morning', 'hey there']
+THANKS = ['thank you', 'thanks a lot', 'that was helpful']
+LAT_RANGE, LON_RANGE = (23.6, 23.9), (90.2, 90.5)
+
+
+def conversation_script(features, rng):
+    """(turn name, request body) pairs for one conversation"""
+    first, second, extra = [s.replace('_', ' ') for s in rng.sample(features, 3)]
+    location = {'latitude': rng.uniform(*LAT_RANGE), 'longitude': rng.uniform(*LON_RANGE)}
+    return [
+        ('greeting', {'message': rng.choice(GREETINGS)}),
+        ('symptoms', {'message': f'i have {first} and {second}'}),
+        ('follow_up', {'message': f'i also have {extra}'}),
+        ('negative', {'message': 'no'}),
+        ('analysis', {'message': "that's all", **location}),
+        ('thanks', {'message': rng.choice(THANKS)}),
+    ]
+
+
+class LoadRecorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(int)
+
+    def record(self, name, seconds, status=None):
+        with self._lock:
+            self.samples[name].append(seconds)
+            if status is not None:
+                self.statuses[str(status)] += 1
+
+
+def run_conversation(index, features, seed, path, recorder):
+    rng = random.Random(seed * 100003 + index)
+    client = app.app.test_client()
+    ids = {'user_id': f'load-user-{index}', 'chat_id': f'load-chat-{index}'}
+    started = time.perf_counter()
+    for turn, body in conversation_script(features, rng):
+        start = time.perf_counter()
+        response = client.post(path, json={**body, **ids})
+        response.get_data()  # a streamed response is only done once its body is read
+        elapsed = time.perf_counter() - start
+        recorder.record(f'turn:{turn}', elapsed)
+        recorder.record('request', elapsed, response.status_code)
+    recorder.record('conversation', time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=8, help='concurrent conversations')
+    parser.add_argument('--conversations', type=int, default=500)
+    parser.add_argument('--warmup', type=int, default=20, help='untimed conversations played first')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stream', action='store_true', help='use /api/chat/stream instead of /api/chat')
+    parser.add_argument('--output', help='write a JSON report to this path')
+    args = parser.parse_args()
+    path = '/api/chat/stream' if args.stream else '/api/chat'
+
+    with tempfile.TemporaryDirectory(prefix='load-chat-') as tmp:
+        history_store, session_store = create_history_store(tmp), create_session_store(tmp)
+        app.resources.get('history_store').set(history_store)
+        app.resources.get('session_store').set(session_store)
+        app.resources.warm_up()  # keep model and index loading out of the timings
+        features = list(app.resources['symptom_encoder'].features)
+
+        for i in range(args.warmup):
+            run_conversation(-1 - i, features, args.seed, path, LoadRecorder())
+
+        recorder = LoadRecorder()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.users) as pool:
+            for future in [pool.submit(run_conversation, i, features, args.seed, path, recorder)
+                           for i in range(args.conversations)]:
+                future.result()
+        elapsed = time.perf_counter() - start
+        history_store.close()
+        session_store.close()
+
+    results = {name: summarize(samples, elapsed) for name, samples in sorted(recorder.samples.items())}
+    errors = sum(count for status, count in recorder.statuses.items() if not status.startswith('2'))
+    print_results(results)
+    print(f"{results['request']['count']} requests in {elapsed:.2f} s, {errors} errors")
+    if args.output:
+        config = {'users': args.users, 'conversations': args.conversations, 'warmup': args.warmup,
+                  'seed': args.seed, 'path': path,
+                  'history_backend': type(history_store).__name__, 'session_backend': type(session_store).__name__,
+                  'model': app.resources['model_bundle'].version}
+        write_report(args.output, 'load_chat', results, config,
+                     totals={'elapsed_s': round(elapsed, 3), 'errors': errors, 'statuses': dict(recorder.statuses)})
+        print(f"📝 Report written to {args.output}")
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
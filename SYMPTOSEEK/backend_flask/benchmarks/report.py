@@ -0,0 +1,95 @@
+"""Latency summaries and JSON reports shared by the benchmark scripts.
+
+A report is ``{"suite", "environment", "config", "results", ...}`` where each
+result maps a benchmark name to its count, throughput and latency
+percentiles in milliseconds. Two reports (e.g. from two commits) are
+compared with ``python benchmarks/compare.py old.json new.json``.
+"""
+import gc
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+
+
+def summarize(samples, elapsed=None):
+    """Count, throughput and percentiles for per-call latencies in seconds.
+
+    ``elapsed`` is the wall time the samples were collected over; without it
+    throughput is the sequential rate, ``len(samples) / sum(samples)``.
+    """
+    samples_ms = np.asarray(samples, dtype=float) * 1000
+    elapsed = elapsed if elapsed is not None else samples_ms.sum() / 1000
+    summary = {
+        'count': int(len(samples_ms)),
+        'ops_per_s': round(len(samples_ms) / elapsed, 1) if elapsed else None,
+        'mean_ms': round(float(samples_ms.mean()), 4),
+    }
+    for p, value in zip(PERCENTILES, np.percentile(samples_ms, PERCENTILES)):
+        summary[f'p{p}_ms'] = round(float(value), 4)
+    summary['max_ms'] = round(float(samples_ms.max()), 4)
+    return summary
+
+
+def time_calls(fn, inputs, warmup=50):
+    """Call ``fn`` on each input after ``warmup`` untimed calls and return per-call latencies in seconds.
+
+    Like ``timeit``, garbage collection is paused while timing so a
+    collection triggered by earlier work does not land on a random call.
+    """
+    for item in inputs[:warmup]:
+        fn(item)
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for item in inputs:
+            start = time.perf_counter()
+            fn(item)
+            samples.append(time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return samples
+
+
+def best_round(run, rounds):
+    """Summary of the ``rounds`` runs of ``run()`` with the lowest median, to filter out noisy runs"""
+    return min((summarize(run()) for _ in range(rounds)), key=lambda summary: summary['p50_ms'])
+
+
+def environment():
+    """Where the numbers came from, so reports from different machines are not compared blindly"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def write_report(path, suite, results, config, **extra):
+    report = {'suite': suite, 'environment': environment(), 'config': config, 'results': results, **extra}
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return report
+
+
+def print_results(results):
+    print(f"{'benchmark':<28} {'count':>7} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, r in results.items():
+        print(f"{name:<28} {r['count']:>7} {r['ops_per_s'] or 0:>10.1f} "
+              f"{r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} {r['p99_ms']:>9.3f}")
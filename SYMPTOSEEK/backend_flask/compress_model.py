@@ -0,0 +1,229 @@
+import argparse
+import copy
+import json
+import os
+import pickle
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.tree._tree import TREE_LEAF, TREE_UNDEFINED, Tree
+
+from forest_engine import export_forest
+from model_registry import ModelRegistry
+
+warnings.filterwarnings('ignore')
+
+TREE_COUNTS = [10, 25, 50, 75, 100, 150]
+DEPTH_LIMITS = [8, 12, 16, 24, 32, None]
+DISTILL_SIZES = [10, 25, 50]
+
+
+def truncate_tree(estimator, max_depth):
+    """Copy of a fitted decision tree cut at ``max_depth``; cut nodes become leaves.
+
+    Internal nodes already carry the class distribution of their training
+    samples, so turning one into a leaf needs no refitting. Surviving nodes
+    are renumbered depth-first so the copy is compact.
+    """
+    tree = estimator.tree_
+    if max_depth is None or tree.max_depth <= max_depth:
+        return estimator
+
+    state = tree.__getstate__()
+    nodes, values = state['nodes'], state['values']
+    order, depths = [], []
+    stack = [(0, 0)]
+    while stack:
+        node, depth = stack.pop()
+        order.append(node)
+        depths.append(depth)
+        if nodes['left_child'][node] != TREE_LEAF and depth < max_depth:
+            stack += [(nodes['right_child'][node], depth + 1), (nodes['left_child'][node], depth + 1)]
+
+    new_id = np.full(len(nodes), TREE_LEAF, dtype=np.int64)
+    new_id[order] = np.arange(len(order))
+    new_nodes = nodes[order].copy()
+    leaves = (new_nodes['left_child'] == TREE_LEAF) | (np.array(depths) >= max_depth)
+    new_nodes['left_child'] = np.where(leaves, TREE_LEAF, new_id[new_nodes['left_child']])
+    new_nodes['right_child'] = np.where(leaves, TREE_LEAF, new_id[new_nodes['right_child']])
+    new_nodes['feature'][leaves] = TREE_UNDEFINED
+    new_nodes['threshold'][leaves] = TREE_UNDEFINED
+
+    pruned = Tree(tree.n_features, np.asarray(tree.n_classes, dtype=np.intp), tree.n_outputs)
+    pruned.__setstate__({
+        'max_depth': int(max(depths)),
+        'node_count': len(order),
+        'nodes': new_nodes,
+        'values': np.ascontiguousarray(values[order]),
+    })
+    truncated = copy.copy(estimator)
+    truncated.tree_ = pruned
+    return truncated
+
+
+def compress_forest(model, n_trees=None, max_depth=None):
+    """Forest keeping the first ``n_trees`` trees, each cut at ``max_depth``.
+
+    Random Forest trees are built independently, so any prefix is an unbiased
+    smaller forest.
+    """
+    estimators = model.estimators_[:n_trees] if n_trees else model.estimators_
+    compressed = copy.copy(model)
+    compressed.estimators_ = [truncate_tree(estimator, max_depth) for estimator in estimators]
+    compressed.n_estimators = len(compressed.estimators_)
+    return compressed
+
+
+def distill_forest(teacher, X, n_estimators, y=None, augment=5, drop_rate=0.3, random_state=42):
+    """Train a smaller forest on the teacher's labels for the training rows plus
+    copies with symptoms randomly dropped, which imitates partially reported cases.
+
+    The student must know every class the teacher does, or its
+    ``predict_proba`` columns stop lining up with the label encoder. Classes
+    the teacher never predicts are seeded from their training rows in ``y``;
+    without ``y`` such classes raise ValueError.
+    """
+    rng = np.random.default_rng(random_state)
+    rows = X.to_numpy(dtype=np.float32)
+    noisy = np.vstack([rows] + [rows * (rng.random(rows.shape) >= drop_rate) for _ in range(augment)])
+    X_distill = pd.DataFrame(noisy[noisy.any(axis=1)], columns=X.columns)
+    y_distill = teacher.predict(X_distill)
+    missing = np.setdiff1d(teacher.classes_, y_distill)
+    if len(missing) and y is not None:
+        seeded = np.isin(np.asarray(y), missing)
+        X_distill = pd.concat([X_distill, pd.DataFrame(rows[seeded], columns=X.columns)], ignore_index=True)
+        y_distill = np.concatenate([y_distill, np.asarray(y)[seeded]])
+
+    student = RandomForestClassifier(n_estimators=n_estimators, random_state=random_state, n_jobs=-1)
+    student.fit(X_distill, y_distill)
+    student.set_params(n_jobs=None)
+    if not np.array_equal(student.classes_, teacher.classes_):
+        raise ValueError(f"Distilled model is missing classes {np.setdiff1d(teacher.classes_, student.classes_).tolist()}; "
+                         "pass the training labels so every class has an example")
+    return student
+
+
+def measure(model, X_test, y_test, repeat=20):
+    """Accuracy, size and single-row latency of one candidate"""
+    y_pred = model.predict(X_test)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.predict_proba(X_test[:1])
+        timings.append(time.perf_counter() - start)
+    return {
+        'test_accuracy': float(accuracy_score(y_test, y_pred)),
+        'n_trees': len(model.estimators_),
+        'n_nodes': int(sum(e.tree_.node_count for e in model.estimators_)),
+        'max_depth': int(max(e.tree_.max_depth for e in model.estimators_)),
+        'model_size_bytes': len(pickle.dumps(model)),
+        'predict_ms': round(float(np.median(timings)) * 1000, 3),
+    }
+
+
+def pareto_front(candidates):
+    """Mark candidates not beaten on both size and accuracy by another one"""
+    for candidate in candidates:
+        candidate['pareto'] = not any(
+            other['n_nodes'] <= candidate['n_nodes'] and other['test_accuracy'] >= candidate['test_accuracy']
+            and (other['n_nodes'], other['test_accuracy']) != (candidate['n_nodes'], candidate['test_accuracy'])
+            for other in candidates
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Shrink the trained Random Forest within an accuracy tolerance on Testing.csv")
+    parser.add_argument('--model', default='models/best_rf_model.joblib')
+    parser.add_argument('--label-encoder', default='models/label_encoder.joblib')
+    parser.add_argument('--train', default='data/Training.csv')
+    parser.add_argument('--test', default='data/Testing.csv')
+    parser.add_argument('--tolerance', type=float, default=0.01, help="largest allowed drop in test accuracy")
+    parser.add_argument('--no-distill', action='store_true')
+    parser.add_argument('--output-dir', default='models/compressed')
+    parser.add_argument('--publish', action='store_true', help="also publish the chosen model as a new registry version")
+    parser.add_argument('--registry', default='models/registry')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    teacher = joblib.load(args.model)
+    teacher.set_params(n_jobs=None)
+    le = joblib.load(args.label_encoder)
+
+    test = pd.read_csv(args.test)
+    X_test = test.drop('prognosis', axis=1)
+    y_test = le.transform(test['prognosis'])
+
+    baseline = dict(measure(teacher, X_test, y_test), strategy='original')
+    print(f"📏 Original: {baseline['n_trees']} trees, {baseline['n_nodes']} nodes, "
+          f"accuracy {baseline['test_accuracy']:.3f}, {baseline['predict_ms']:.2f} ms")
+    floor = baseline['test_accuracy'] - args.tolerance
+
+    candidates, models = [], []
+    tree_counts = [n for n in TREE_COUNTS if n < len(teacher.estimators_)] + [None]
+    for n_trees in tree_counts:
+        for max_depth in DEPTH_LIMITS:
+            if n_trees is None and max_depth is None:
+                continue
+            model = compress_forest(teacher, n_trees, max_depth)
+            candidates.append(dict(measure(model, X_test, y_test), strategy='prune',
+                                   keep_trees=n_trees, depth_limit=max_depth))
+            models.append(model)
+
+    if not args.no_distill:
+        train = pd.read_csv(args.train)
+        X_train, y_train = train.drop('prognosis', axis=1), le.transform(train['prognosis'])
+        for n_estimators in DISTILL_SIZES:
+            model = distill_forest(teacher, X_train, n_estimators, y=y_train)
+            candidates.append(dict(measure(model, X_test, y_test), strategy='distill',
+                                   keep_trees=n_estimators, depth_limit=None))
+            models.append(model)
+
+    for candidate in candidates:
+        candidate['within_tolerance'] = candidate['test_accuracy'] >= floor
+    pareto_front(candidates + [baseline])
+    curve = sorted(candidates, key=lambda c: c['n_nodes'])
+    for c in curve:
+        mark = '✅' if c['within_tolerance'] else '  '
+        print(f"{mark} {c['strategy']:<8} trees={c['keep_trees']!s:<5} depth={c['depth_limit']!s:<5} "
+              f"nodes={c['n_nodes']:<7} acc={c['test_accuracy']:.3f} {c['predict_ms']:.2f} ms")
+
+    eligible = [i for i, c in enumerate(candidates) if c['within_tolerance']]
+    chosen = min(eligible, key=lambda i: (candidates[i]['n_nodes'], candidates[i]['predict_ms'])) if eligible else None
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    report = {'baseline': baseline, 'tolerance': args.tolerance, 'curve': curve,
+              'chosen': candidates[chosen] if chosen is not None else None}
+    if chosen is None:
+        print(f"⚠️ No candidate stays within {args.tolerance:.3f} of the original accuracy; nothing written")
+    else:
+        model = models[chosen]
+        joblib.dump(model, os.path.join(args.output_dir, 'best_rf_model.joblib'))
+        joblib.dump(le, os.path.join(args.output_dir, 'label_encoder.joblib'))
+        export_forest(model, os.path.join(args.output_dir, 'forest'))
+        c = candidates[chosen]
+        if args.publish:
+            report['version'] = ModelRegistry(args.registry).publish(model, le, {
+                'source': 'compress_model.py',
+                'compression': {k: c[k] for k in ('strategy', 'keep_trees', 'depth_limit')},
+                'metrics': {'test_accuracy': c['test_accuracy'], 'predict_ms': c['predict_ms'],
+                            'original_test_accuracy': baseline['test_accuracy']},
+            })
+        print(f"🏆 Chosen: {c['strategy']} with {c['n_nodes']} nodes "
+              f"({c['n_nodes'] / baseline['n_nodes']:.0%} of the original), accuracy {c['test_accuracy']:.3f}")
+
+    report_path = os.path.join(args.output_dir, 'compression_report.json')
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"📝 Trade-off curve written to {report_path}")
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPECIALTY = 'General Medicine'
+MIN_DESCRIPTION_LENGTH = 20
+MIN_PRECAUTIONS = 2
+
+# Curated text for common conditions the local dataset does not describe well
+FALLBACK_INFO = {
+    'common cold': {
+        'description': 'The common cold is a viral infection of your nose and throat (upper respiratory tract). It\'s usually harmless, although it might not feel that way. Common symptoms include runny or stuffy nose, sneezing, cough, and mild fatigue.',
+        'precautions': [
+            'Get plenty of rest and stay hydrated',
+            'Use saline nasal drops to relieve congestion',
+            'Gargle with warm salt water for sore throat',
+            'Wash hands frequently to prevent spread'
+        ]
+    },
+    'diabetes': {
+        'description': 'Diabetes is a group of metabolic disorders characterized by high blood sugar levels. It occurs when your body doesn\'t make enough insulin or can\'t effectively use the insulin it makes.',
+        'precautions': [
+            'Monitor blood glucose levels regularly',
+            'Follow a balanced diet with controlled carbohydrate intake',
+            'Exercise regularly as recommended by your doctor',
+            'Take medications as prescribed and attend regular checkups'
+        ]
+    },
+    'hypertension': {
+        'description': 'Hypertension (high blood pressure) is a condition where the force of blood against artery walls is consistently too high. It can lead to serious health complications if left untreated.',
+        'precautions': [
+            'Reduce sodium intake and maintain a healthy diet',
+            'Exercise regularly and maintain a healthy weight',
+            'Limit alcohol consumption and quit smoking',
+            'Take prescribed medications consistently and monitor blood pressure'
+        ]
+    },
+    'migraine': {
+        'description': 'Migraine is a neurological condition that can cause severe headaches, often accompanied by nausea, vomiting, and sensitivity to light and sound. Episodes can last hours to days.',
+        'precautions': [
+            'Identify and avoid known triggers',
+            'Maintain regular sleep schedule and manage stress',
+            'Stay hydrated and eat regular meals',
+            'Use prescribed medications as directed by your doctor'
+        ]
+    }
+}
+
+
+def normalize_disease(name):
+    return str(name).strip().lower()
+
+
+def fallback_info(disease_name):
+    """Generic description and precautions for a disease the local dataset does not cover"""
+    disease_key = normalize_disease(disease_name)
+    if disease_key in FALLBACK_INFO:
+        return FALLBACK_INFO[disease_key]
+
+    if any(term in disease_key for term in ['infection', 'bacterial', 'viral']):
+        return {
+            'description': f'{disease_name} is an infection that affects the body. Infections can be caused by bacteria, viruses, fungi, or parasites. Proper medical treatment is essential for recovery.',
+            'precautions': [
+                'Complete the full course of prescribed antibiotics or antiviral medications',
+                'Get adequate rest and maintain good hygiene',
+                'Stay hydrated and eat nutritious foods',
+                'Isolate if contagious and follow medical advice'
+            ]
+        }
+
+    if any(term in disease_key for term in ['heart', 'cardiac', 'cardiovascular']):
+        return {
+            'description': f'{disease_name} is a cardiovascular condition affecting the heart or blood vessels. Heart conditions require immediate medical attention and ongoing care.',
+            'precautions': [
+                'Follow a heart-healthy diet low in saturated fats',
+                'Exercise as recommended by your cardiologist',
+                'Take prescribed medications consistently',
+                'Monitor symptoms and seek immediate help for chest pain'
+            ]
+        }
+
+    return {
+        'description': f'{disease_name} is a medical condition that requires proper medical evaluation and treatment. Symptoms, causes, and treatments can vary significantly between individuals. A healthcare professional can provide personalized guidance based on your specific situation.',
+        'precautions': [
+            'Consult a qualified healthcare professional for accurate diagnosis',
+            'Follow all prescribed medications and treatment plans',
+            'Maintain a healthy lifestyle with proper diet and exercise',
+            'Monitor your symptoms and report any changes to your doctor',
+            'Attend all scheduled follow-up appointments'
+        ]
+    }
+
+
+class DiseaseEntry:
+    """Everything the analysis response needs about one disease, rendered once"""
+
+    __slots__ = ('name', 'description', 'precautions', 'specialty', 'fallback',
+                 'description_text', 'precautions_text', 'doctor_intro', 'location_help')
+
+    def __init__(self, name, description, precautions, specialty, fallback=False):
+        self.name = name
+        self.description = description
+        self.precautions = list(precautions)
+        self.specialty = specialty
+        self.fallback = fallback
+
+        self.description_text = f"� **Understanding {name}:**\n{description}"
+        self.precautions_text = (
+            "🛡️ **Immediate Care Recommendations:**\n" + "\n".join(f"• {prec}" for prec in self.precautions)
+            if self.precautions else None
+        )
+        self.doctor_intro = f"🏥 **Recommended {specialty}s Near You:**\nI've found some qualified specialists in your area. You can view their locations on the map below and choose the most convenient option for you."
+        self.location_help = f"""�️ **Finding a {specialty}:**
+Don't worry! Here are some ways to find a qualified specialist:
+• Search online directories like Zocdoc, Healthgrades, or your insurance provider's website
+• Ask your primary care doctor for a referral
+• Contact your local hospital for specialist recommendations
+• Check with your insurance for covered providers in your area
+
+Would you like me to help you with anything else regarding your symptoms?"""
+
+
+class MissingDiseaseError(KeyError):
+    """Some classes the model can predict have no knowledge entry, or no dataset text in strict mode"""
+
+
+class DiseaseKnowledge:
+    """Normalized disease name -> :class:`DiseaseEntry`, built once at startup.
+
+    Descriptions and precautions come from the local CSVs when they are
+    usable and from :func:`fallback_info` otherwise, so a request does one
+    dict lookup instead of filtering the data frames and re-rendering text.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    @classmethod
+    def build(cls, description_df, precaution_df, specialties, classes=(), default_specialty=DEFAULT_SPECIALTY):
+        descriptions = {
+            normalize_disease(disease): text
+            for disease, text in zip(description_df['Disease'], description_df['Symptom_Description'])
+            if pd.notna(text)
+        }
+        precaution_columns = [c for c in precaution_df.columns if c.startswith('Symptom_precaution_')]
+        precautions = {
+            normalize_disease(row['Disease']): [row[c] for c in precaution_columns if pd.notna(row[c])]
+            for row in precaution_df.to_dict('records')
+        }
+        specialties = {normalize_disease(disease): specialty for disease, specialty in specialties.items()}
+
+        # Model classes first so their spelling is the one shown to users
+        names = {}
+        for name in list(classes) + list(description_df['Disease']) + list(precaution_df['Disease']):
+            names.setdefault(normalize_disease(name), str(name).strip())
+
+        entries = {}
+        for key, name in names.items():
+            fallback = False
+            description = descriptions.get(key, '')
+            if not description or len(description.strip()) < MIN_DESCRIPTION_LENGTH:
+                description, fallback = fallback_info(name)['description'], True
+            disease_precautions = precautions.get(key, [])
+            if len(disease_precautions) < MIN_PRECAUTIONS:
+                disease_precautions, fallback = fallback_info(name)['precautions'], True
+            entries[key] = DiseaseEntry(name, description, disease_precautions,
+                                        specialties.get(key, default_specialty), fallback)
+        return cls(entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, name):
+        return normalize_disease(name) in self.entries
+
+    def get(self, name):
+        """Entry for ``name``; a disease outside the table gets an unsaved fallback entry"""
+        entry = self.entries.get(normalize_disease(name))
+        if entry is None:
+            info = fallback_info(name)
+            entry = DiseaseEntry(str(name).strip(), info['description'], info['precautions'], DEFAULT_SPECIALTY, True)
+        return entry
+
+    def uncovered(self, classes):
+        """Classes without an entry backed by the description and precaution CSVs"""
+        return [str(c) for c in classes
+                if getattr(self.entries.get(normalize_disease(c)), 'fallback', True)]
+
+    def validate(self, classes, strict=False):
+        """Check that every class is described by the dataset and return the classes that are not.
+
+        A class with no entry at all raises :class:`MissingDiseaseError`.
+        Classes answered only with generic fallback text are logged, or
+        raise too when ``strict``.
+        """
+        missing = [str(c) for c in classes if normalize_disease(c) not in self.entries]
+        if missing:
+            raise MissingDiseaseError(f"{len(missing)} model classes have no disease knowledge entry: {missing}")
+        uncovered = self.uncovered(classes)
+        if uncovered and strict:
+            raise MissingDiseaseError(f"{len(uncovered)} model classes are not covered by the disease CSVs: {uncovered}")
+        if uncovered:
+            logger.warning("%d of %d model classes are not covered by the disease CSVs and use generic text: %s",
+                           len(uncovered), len(classes), uncovered)
+        return uncovered
+
+    def fallback_count(self):
+        return sum(entry.fallback for entry in self.entries.values())
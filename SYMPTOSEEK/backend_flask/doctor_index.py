@@ -0,0 +1,135 @@
+import logging
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat, lon, coords):
+    """Great-circle distance in km from one point (radians) to an ``(n, 2)`` array of radians"""
+    dlat = coords[:, 0] - lat
+    dlon = coords[:, 1] - lon
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat) * np.cos(coords[:, 0]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class DoctorIndex:
+    """Doctor directory preprocessed once for nearest-doctor lookups.
+
+    Rows without usable coordinates or speciality are dropped at build time
+    and the remaining coordinates are kept as a radians NumPy array. Each
+    specialty label in ``specialty_keywords`` is resolved up front to the
+    array of matching row ids (case-insensitive substring match on the
+    ``speciality`` column), so a specialty lookup is a dict access. Small
+    candidate sets are ranked with one vectorized haversine pass and
+    ``argpartition``; sets of ``tree_threshold`` rows or more get a cached
+    haversine ``BallTree`` so lookups stay logarithmic as the directory grows.
+    """
+
+    REQUIRED_COLUMNS = ['latitude', 'longitude', 'speciality']
+
+    def __init__(self, doctors_df, specialty_keywords=None, tree_threshold=256):
+        if not set(self.REQUIRED_COLUMNS) <= set(doctors_df.columns):
+            logger.warning("Doctor dataset has no coordinates/speciality columns; doctor search disabled")
+            doctors_df = pd.DataFrame(columns=self.REQUIRED_COLUMNS)
+
+        clean = doctors_df.dropna(subset=['latitude', 'longitude', 'speciality']).copy()
+        clean['latitude'] = pd.to_numeric(clean['latitude'], errors='coerce')
+        clean['longitude'] = pd.to_numeric(clean['longitude'], errors='coerce')
+        clean = clean.dropna(subset=['latitude', 'longitude'])
+        clean = clean[(clean['latitude'] != 0) & (clean['longitude'] != 0)].reset_index(drop=True)
+
+        self.records = clean.to_dict('records')
+        for doc in self.records:
+            doc['map_url'] = f"http://www.openstreetmap.org/?mlat={doc['latitude']}&mlon={doc['longitude']}&zoom=16"
+        self.specialities = clean['speciality'].str.lower().tolist()
+        self.coords = np.radians(clean[['latitude', 'longitude']].to_numpy(dtype=np.float64))
+        self.tree_threshold = tree_threshold
+        self._trees = {}
+        self.source_path = None
+        self.source_mtime = None
+
+        self.specialty_rows = {}
+        specialities = pd.Series(self.specialities, dtype=object)
+        for label, keywords in (specialty_keywords or {}).items():
+            if keywords:
+                pattern = '|'.join(re.escape(keyword.lower()) for keyword in keywords)
+                self.specialty_rows[label] = np.flatnonzero(specialities.str.contains(pattern, regex=True).to_numpy(dtype=bool))
+            else:
+                self.specialty_rows[label] = np.empty(0, dtype=np.intp)
+
+    @classmethod
+    def from_csv(cls, path, specialty_keywords=None, **kwargs):
+        """Build the index from a doctors CSV, remembering its mtime for :meth:`is_stale`"""
+        mtime = os.path.getmtime(path)
+        doctors_df = pd.read_csv(path)
+        doctors_df.columns = doctors_df.columns.str.strip()
+        index = cls(doctors_df, specialty_keywords, **kwargs)
+        index.source_path = path
+        index.source_mtime = mtime
+        return index
+
+    def is_stale(self):
+        """True when the CSV the index was built from has changed on disk"""
+        if self.source_path is None:
+            return False
+        try:
+            return os.path.getmtime(self.source_path) != self.source_mtime
+        except OSError:
+            return False
+
+    def __len__(self):
+        return len(self.records)
+
+    def rows_for_specialty(self, label):
+        """Row ids of the doctors matching a specialty label (empty if unknown)"""
+        return self.specialty_rows.get(label, np.empty(0, dtype=np.intp))
+
+    def _tree(self, key, row_ids):
+        # Keyed by name alone: comparing row ids on every query would cost O(n)
+        tree = self._trees.get(key)
+        if tree is None:
+            tree = self._trees[key] = BallTree(self.coords[row_ids], metric='haversine')
+        return tree
+
+    def nearest_for_specialty(self, label, user_lat, user_lon, k=3):
+        """Return the ``k`` nearest doctors for a specialty label"""
+        return self.nearest(self.rows_for_specialty(label), user_lat, user_lon, k=k, key=label)
+
+    def nearest(self, row_ids, user_lat, user_lon, k=3, key=None):
+        """Return the ``k`` doctors among ``row_ids`` closest to the user, nearest first.
+
+        ``key`` names the candidate set (e.g. the specialty) so its spatial
+        tree can be reused across requests; the same key must always come
+        with the same ``row_ids`` for a given index.
+        """
+        row_ids = np.asarray(row_ids, dtype=np.intp)
+        if len(row_ids) == 0:
+            return []
+        try:
+            lat, lon = np.radians(float(user_lat)), np.radians(float(user_lon))
+        except (TypeError, ValueError):
+            return []
+        k = min(k, len(row_ids))
+
+        if key is not None and len(row_ids) >= self.tree_threshold:
+            distances, positions = self._tree(key, row_ids).query([[lat, lon]], k=k)
+            distances, positions = distances[0] * EARTH_RADIUS_KM, positions[0]
+        else:
+            all_distances = haversine_km(lat, lon, self.coords[row_ids])
+            positions = np.argpartition(all_distances, k - 1)[:k]
+            positions = positions[np.argsort(all_distances[positions], kind='stable')]
+            distances = all_distances[positions]
+
+        recommended = []
+        for position, distance in zip(positions, distances):
+            doc = dict(self.records[row_ids[position]])
+            doc['distance'] = float(distance)
+            recommended.append(doc)
+        return recommended
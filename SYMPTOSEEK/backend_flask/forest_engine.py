@@ -0,0 +1,297 @@
+import argparse
+import json
+import os
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+FORMAT_VERSION = 2
+META_FILE = 'meta.json'
+ARRAYS = (
+    'roots', 'feature', 'threshold', 'left', 'right', 'leaf', 'leaf_values',
+    'leaf_base', 'feature_masks'
+)
+ROW_CHUNK = 128
+
+
+def _leaf_ranks(tree):
+    """Left-to-right rank of every leaf, and for each node the rank range ``[lo, hi)`` of its leaves"""
+    lo = np.zeros(tree.node_count, dtype=np.int64)
+    hi = np.zeros(tree.node_count, dtype=np.int64)
+    rank = np.full(tree.node_count, -1, dtype=np.int64)
+    next_rank = 0
+    stack = [(0, False)]
+    while stack:
+        node, visited = stack.pop()
+        left, right = tree.children_left[node], tree.children_right[node]
+        if left == -1:
+            rank[node] = lo[node] = next_rank
+            next_rank += 1
+            hi[node] = next_rank
+        elif visited:
+            lo[node], hi[node] = lo[left], hi[right]
+        else:
+            stack += [(node, True), (right, False), (left, False)]
+    return rank, lo, hi
+
+
+def _compile_masks(trees, ranges, n_features, n_words):
+    """Per-feature leaf bitmasks for binary inputs, ``(n_features, n_trees, n_words)``.
+
+    A node ``x[f] <= t`` is false exactly when feature ``f`` is set, and then
+    none of the leaves in its left subtree can be reached. ANDing the masks of
+    every set feature leaves the exit leaf as the lowest remaining bit of each
+    tree, since leaves are numbered left to right.
+    """
+    reachable = np.ones((n_features, len(trees), n_words * 64), dtype=bool)
+    for t, (tree, (_, lo, hi)) in enumerate(zip(trees, ranges)):
+        for node in np.flatnonzero(tree.children_left != -1):
+            left = tree.children_left[node]
+            reachable[tree.feature[node], t, lo[left]:hi[left]] = False
+    return np.packbits(reachable, axis=-1, bitorder='little').view('<u8')
+
+
+def export_forest(model, directory):
+    """Write a fitted ``RandomForestClassifier`` as flat NumPy node arrays.
+
+    All trees are concatenated into one node table with global child ids.
+    Leaves point to themselves (feature 0, threshold +inf) so traversal can
+    keep stepping finished trees without branching, and each leaf carries a
+    row of ``leaf_values`` holding its normalized class distribution. Leaf
+    rows are numbered left to right within each tree, starting at
+    ``leaf_base[tree]``.
+
+    When every split uses the same threshold (always the case for 0/1
+    features) per-feature leaf bitmasks are compiled as well, which lets
+    :class:`ForestEngine` skip tree traversal entirely.
+    """
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    n_classes = int(model.n_classes_)
+    n_features = int(model.n_features_in_)
+    ranges = [_leaf_ranks(tree) for tree in trees]
+
+    roots, feature, threshold, left, right, leaf, leaf_values, leaf_base = [], [], [], [], [], [], [], []
+    offset = 0
+    n_leaves = 0
+    for tree, (rank, _, _) in zip(trees, ranges):
+        ids = np.arange(tree.node_count, dtype=np.int32) + offset
+        is_leaf = tree.children_left == -1
+        leaf_ids = np.where(is_leaf, rank + n_leaves, -1).astype(np.int32)
+
+        values = np.empty((int(is_leaf.sum()), n_classes), dtype=np.float64)
+        values[rank[is_leaf]] = tree.value[is_leaf, 0, :]
+        values /= values.sum(axis=1, keepdims=True)
+
+        roots.append(offset)
+        leaf_base.append(n_leaves)
+        feature.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        threshold.append(np.where(is_leaf, np.inf, tree.threshold).astype(np.float64))
+        left.append(np.where(is_leaf, ids, tree.children_left + offset).astype(np.int32))
+        right.append(np.where(is_leaf, ids, tree.children_right + offset).astype(np.int32))
+        leaf.append(leaf_ids)
+        leaf_values.append(values)
+        offset += tree.node_count
+        n_leaves += len(values)
+
+    split_thresholds = np.unique(np.concatenate([tree.threshold[tree.children_left != -1] for tree in trees]))
+    split_threshold = float(split_thresholds[0]) if len(split_thresholds) == 1 else None
+    n_words = -(-max(int(tree.n_leaves) for tree in trees) // 64)
+    if split_threshold is not None:
+        feature_masks = _compile_masks(trees, ranges, n_features, n_words)
+    else:
+        feature_masks = np.empty((0, len(trees), n_words), dtype='<u8')
+
+    arrays = {
+        'roots': np.array(roots, dtype=np.int32),
+        'feature': np.concatenate(feature),
+        'threshold': np.concatenate(threshold),
+        'left': np.concatenate(left),
+        'right': np.concatenate(right),
+        'leaf': np.concatenate(leaf),
+        'leaf_values': np.concatenate(leaf_values),
+        'leaf_base': np.array(leaf_base, dtype=np.int32),
+        'feature_masks': feature_masks,
+    }
+    os.makedirs(directory, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f'{name}.npy'), np.ascontiguousarray(array))
+
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'n_trees': len(trees),
+        'n_nodes': offset,
+        'n_leaves': n_leaves,
+        'n_features': n_features,
+        'n_classes': n_classes,
+        'max_depth': max(int(tree.max_depth) for tree in trees),
+        'split_threshold': split_threshold,
+        'classes': np.asarray(model.classes_).tolist(),
+        'feature_names': [str(f) for f in getattr(model, 'feature_names_in_', [])],
+    }
+    # meta.json goes last so a half-written export is never picked up
+    with open(os.path.join(directory, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    return meta
+
+
+def artifact_exists(directory):
+    return os.path.exists(os.path.join(directory, META_FILE))
+
+
+def _lowest_set_bit(words):
+    """Index of the lowest set bit along the last axis of a uint64 array"""
+    word = np.argmax(words != 0, axis=-1)
+    value = np.take_along_axis(words, word[..., np.newaxis], axis=-1)[..., 0]
+    lowest = value & (~value + np.uint64(1))
+    # frexp(2**k) == (0.5, k + 1) exactly
+    return word * 64 + np.frexp(lowest.astype(np.float64))[1] - 1
+
+
+class ForestEngine:
+    """Random Forest inference over arrays written by :func:`export_forest`.
+
+    Arrays are opened with ``mmap_mode='r'`` by default, so loading costs a
+    few file opens and worker processes share the same page-cache pages
+    instead of each unpickling its own copy of the forest.
+
+    Forests trained on 0/1 symptom features are scored from the compiled
+    leaf bitmasks: a row costs one AND per (set feature, tree that tests
+    it), independent of tree depth. Other forests fall back to a vectorized
+    traversal of the node arrays. Both match ``predict_proba`` of the
+    original ``RandomForestClassifier``, including its per-tree summation
+    order.
+    """
+
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        self.roots = arrays['roots']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.leaf = arrays['leaf']
+        self.leaf_values = arrays['leaf_values']
+        self.leaf_base = arrays['leaf_base']
+        self.feature_masks = arrays['feature_masks']
+        self.classes_ = np.array(meta['classes'])
+        self.n_classes_ = meta['n_classes']
+        self.n_features_in_ = meta['n_features']
+        self.split_threshold = meta['split_threshold']
+        if meta['feature_names']:
+            self.feature_names_in_ = np.array(meta['feature_names'], dtype=object)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        with open(os.path.join(directory, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported forest format version: {meta.get('format_version')}; re-run forest_engine.py")
+        mmap_mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode) for name in ARRAYS}
+        # Plain ndarray views over the mapping: np.memmap indexing is several times slower
+        return cls({name: array.view(np.ndarray) for name, array in arrays.items()}, meta)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def binary(self):
+        """True when leaves can be found from bitmasks instead of traversal"""
+        return self.split_threshold is not None
+
+    def _check(self, X):
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected input of shape (n_samples, {self.n_features_in_}), got {X.shape}")
+        return X
+
+    def _traverse(self, X):
+        rows = np.arange(X.shape[0])[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_trees))
+        while True:
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            next_nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+            if np.array_equal(next_nodes, nodes):
+                return self.leaf[nodes]
+            nodes = next_nodes
+
+    def _leaves_from_masks(self, rows, features, n_rows):
+        """Exit leaves for ``n_rows`` rows whose set features are given as sorted ``(row, feature)`` pairs"""
+        if n_rows == 1 and len(features):
+            reachable = np.bitwise_and.reduce(self.feature_masks[features], axis=0, keepdims=True)
+        else:
+            reachable = np.full((n_rows,) + self.feature_masks.shape[1:], np.iinfo(np.uint64).max, dtype='<u8')
+            if len(rows):
+                starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+                reachable[rows[starts]] = np.bitwise_and.reduceat(self.feature_masks[features], starts, axis=0)
+        return self.leaf_base + _lowest_set_bit(reachable)
+
+    def apply(self, X):
+        """Leaf row (into ``leaf_values``) reached in every tree: ``(n_samples, n_trees)``"""
+        X = self._check(X)
+        if not self.binary:
+            return self._traverse(X)
+        rows, features = np.nonzero(X > self.split_threshold)
+        return self._leaves_from_masks(rows, features, X.shape[0])
+
+    def _average(self, leaves):
+        # A sparse leaf-indicator product adds leaf distributions tree by tree,
+        # the same order RandomForestClassifier accumulates them in
+        n_rows, n_trees = leaves.shape
+        if n_rows == 1:
+            return self.leaf_values[leaves[0]].sum(axis=0, keepdims=True) / n_trees
+        indicator = csr_matrix(
+            (np.ones(leaves.size), leaves.ravel(), np.arange(0, leaves.size + 1, n_trees)),
+            shape=(n_rows, len(self.leaf_values))
+        )
+        return (indicator @ self.leaf_values) / n_trees
+
+    def predict_proba(self, X):
+        """Class probabilities for a batch, scored ``ROW_CHUNK`` rows at a time to bound memory"""
+        X = self._check(X)
+        proba = np.empty((X.shape[0], self.n_classes_), dtype=np.float64)
+        for start in range(0, X.shape[0], ROW_CHUNK):
+            proba[start:start + ROW_CHUNK] = self._average(self.apply(X[start:start + ROW_CHUNK]))
+        return proba
+
+    def predict_proba_one(self, x):
+        """Class probabilities for a single feature row, as a 1-D array"""
+        return self.predict_proba(np.asarray(x).reshape(1, -1))[0]
+
+    def predict_proba_indices(self, indices):
+        """Class probabilities for one row given only the indices of its features set to 1.
+
+        This takes the compact encoding from ``SymptomEncoder.indices``; on a
+        binary forest it ANDs one precomputed mask per symptom and never
+        builds a dense row.
+        """
+        indices = np.asarray(indices, dtype=np.intp)
+        if not self.binary:
+            row = np.zeros((1, self.n_features_in_), dtype=np.float32)
+            row[0, indices] = 1
+            return self.predict_proba(row)[0]
+        if not 1 > self.split_threshold:
+            indices = indices[:0]
+        leaves = self._leaves_from_masks(np.zeros(len(indices), dtype=np.intp), indices, 1)
+        return self._average(leaves)[0]
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a joblib Random Forest to the memory-mapped forest format")
+    parser.add_argument('model', nargs='?', default='models/best_rf_model.joblib')
+    parser.add_argument('output', nargs='?', default='models/forest')
+    args = parser.parse_args()
+
+    import joblib
+    meta = export_forest(joblib.load(args.model), args.output)
+    size_mb = sum(os.path.getsize(os.path.join(args.output, f'{name}.npy')) for name in ARRAYS) / 1e6
+    print(f"✅ Exported {meta['n_trees']} trees ({meta['n_nodes']} nodes, {size_mb:.1f} MB) to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,669 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+RETENTION_FIELDS = ('created_at', 'last_updated')
+
+
+def generate_chat_title(messages):
+    """Generate a title for the chat based on first user message"""
+    for msg in messages:
+        if msg.get('isUser', False) and msg.get('text'):
+            text = msg['text']
+            # Extract first meaningful part and limit length
+            if len(text) > 40:
+                return text[:37] + "..."
+            return text
+    return "New Chat"
+
+
+def message_preview(text):
+    """Shorten a message for the chat list"""
+    return text[:100] + "..." if len(text) > 100 else text
+
+
+def new_summary():
+    return {'message_count': 0, 'last_preview': '', 'last_bot_preview': ''}
+
+
+def update_summary(summary, message):
+    """Fold one new message into a chat summary.
+
+    Only text messages produce a preview; doctor and map payloads are skipped.
+    """
+    summary['message_count'] += 1
+    text = message.get('text', '')
+    if isinstance(text, str):
+        preview = message_preview(text)
+        summary['last_preview'] = preview
+        if not message.get('isUser', False):
+            summary['last_bot_preview'] = preview
+
+
+def chat_cursor(last_updated, chat_id):
+    """Cursor pointing just past a chat in the most-recent-first chat list"""
+    return f"{last_updated.isoformat()}|{chat_id}"
+
+
+def parse_chat_cursor(cursor):
+    """Split a chat list cursor into ``(last_updated, chat_id)``"""
+    timestamp, sep, chat_id = cursor.partition('|')
+    if not sep:
+        raise ValueError(f"Malformed chat cursor: {cursor!r}")
+    return datetime.fromisoformat(timestamp), chat_id
+
+
+def check_limit(limit):
+    """Reject negative limits, which SQLite would read as "no limit" """
+    if limit is not None and limit < 0:
+        raise ValueError(f"Negative limit: {limit!r}")
+
+
+def check_message_cursor(before):
+    """Reject message cursors no ``next_before`` could have produced"""
+    if before is not None and before < 0:
+        raise ValueError(f"Malformed message cursor: {before!r}")
+
+
+class ChatHistoryStore:
+    """Interface shared by the chat history backends.
+
+    Chats are returned as dicts with ``messages``, ``created_at``, ``title``
+    and ``last_updated`` keys. Backends also keep a per-chat summary (title,
+    preview of the last bot message, message count) up to date on every
+    write so listing never has to read messages.
+
+    Listing and message reads are cursor-paginated: they return
+    ``(items, next_before)`` where ``next_before`` is passed back as
+    ``before`` to fetch the next (older) page, or is None on the last page.
+    """
+
+    def add_message(self, user_id, chat_id, message):
+        raise NotImplementedError
+
+    def get_chat(self, user_id, chat_id):
+        raise NotImplementedError
+
+    def list_chat_summaries(self, user_id, limit=None, before=None):
+        """Return chat summaries, most recently updated first.
+
+        Each summary has ``chat_id``, ``title``, ``last_message``,
+        ``message_count``, ``created_at`` and ``last_updated``.
+        """
+        raise NotImplementedError
+
+    def get_chat_summary(self, user_id, chat_id):
+        """Return the summary of one chat, or None if it does not exist"""
+        raise NotImplementedError
+
+    def get_messages(self, user_id, chat_id, limit=None, before=None):
+        """Return the newest ``limit`` messages older than cursor ``before``, oldest first.
+
+        A chat that does not exist reads as an empty page. Raises ValueError
+        for a cursor no page could have returned.
+        """
+        raise NotImplementedError
+
+    def delete_chat(self, user_id, chat_id):
+        raise NotImplementedError
+
+    def expire_chats(self, cutoff, field='created_at', limit=None):
+        """Drop up to ``limit`` of the chats whose ``field`` is before ``cutoff``, oldest first.
+
+        ``field`` is ``created_at`` or ``last_updated``. Returns how many
+        chats were removed; the cost is proportional to that number, not to
+        the size of the history.
+        """
+        raise NotImplementedError
+
+    def cleanup_old_chats(self, cutoff):
+        """Drop chats created before ``cutoff`` and return how many were removed"""
+        return self.expire_chats(cutoff)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class JournalHistoryStore(ChatHistoryStore):
+    """In-memory chat history persisted as a snapshot plus an append-only journal.
+
+    Every mutation is appended to the journal as one JSON line, so writing a
+    message costs O(message) instead of re-serializing every chat. Once
+    ``compact_every`` records have accumulated the full state is written to
+    the snapshot (atomically, via a temp file) and the journal is truncated.
+
+    Journal records carry a sequence number that is also stored in the
+    snapshot, which makes replay idempotent if the process dies between
+    replacing the snapshot and truncating the journal. A torn last line left
+    by a crash mid-write is discarded on recovery.
+
+    For retention, chats are also kept in two insertion-ordered indexes, one
+    by ``created_at`` and one by ``last_updated`` (a chat moves to the end
+    whenever it gets a message), so the oldest chats are always at the front
+    and expiring them never scans the rest.
+    """
+
+    def __init__(self, snapshot_path, journal_path=None, compact_every=1000, fsync=False):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or os.path.splitext(snapshot_path)[0] + '.journal'
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.chats = {}  # {user_id: {chat_id: {messages: [], created_at: datetime, title: str, last_updated: datetime, summary: {}}}}
+        self._order = {}  # {user_id: [(last_updated, chat_id), ...]} kept sorted for paging
+        self._by_time = {field: OrderedDict() for field in RETENTION_FIELDS}  # {field: {(user_id, chat_id): time}}, oldest first
+        self._seq = 0
+        self._pending = 0
+        self._journal = None
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+        self._recover()
+
+    # -- recovery ---------------------------------------------------------
+
+    def _recover(self):
+        snapshot_seq = self._load_snapshot()
+        self._seq = snapshot_seq
+        replayed = self._replay_journal(snapshot_seq)
+        if replayed:
+            logger.info("Recovered %d chat history records from journal", replayed)
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+
+    def _load_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return 0
+        with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        # Snapshots written before the journal existed are the bare
+        # {user_id: {chat_id: ...}} mapping
+        if isinstance(data.get('chats'), dict) and isinstance(data.get('seq'), int):
+            seq, serialized = data['seq'], data['chats']
+        else:
+            seq, serialized = 0, data
+
+        for user_id, user_chats in serialized.items():
+            self.chats[user_id] = {}
+            for chat_id, chat_data in user_chats.items():
+                summary = new_summary()
+                for message in chat_data['messages']:
+                    update_summary(summary, message)
+                chat = self.chats[user_id][chat_id] = {
+                    'messages': chat_data['messages'],
+                    'created_at': datetime.fromisoformat(chat_data['created_at']),
+                    'title': chat_data['title'],
+                    'last_updated': datetime.fromisoformat(chat_data.get('last_updated', chat_data['created_at'])),
+                    'summary': summary
+                }
+                insort(self._order.setdefault(user_id, []), (chat['last_updated'], chat_id))
+
+        for field, index in self._by_time.items():
+            chats = [((user_id, chat_id), chat[field])
+                     for user_id, user_chats in self.chats.items() for chat_id, chat in user_chats.items()]
+            index.update(sorted(chats, key=lambda item: item[1]))
+        return seq
+
+    def _replay_journal(self, snapshot_seq):
+        if not os.path.exists(self.journal_path):
+            return 0
+
+        replayed = 0
+        good_offset = 0
+        with open(self.journal_path, 'rb') as f:
+            for raw_line in f:
+                try:
+                    record = json.loads(raw_line)
+                except ValueError:
+                    # Torn write from a crash: everything after the last
+                    # complete record is discarded
+                    logger.warning("Discarding corrupt chat history journal tail at byte %d", good_offset)
+                    break
+                good_offset += len(raw_line)
+                self._seq = max(self._seq, record['seq'])
+                if record['seq'] <= snapshot_seq:
+                    continue
+                self._apply(record)
+                replayed += 1
+
+        if good_offset != os.path.getsize(self.journal_path):
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(good_offset)
+        self._pending = replayed
+        return replayed
+
+    # -- journal ----------------------------------------------------------
+
+    def _unlink(self, user_id, chat_id):
+        """Remove a chat from both the chat map and the listing order"""
+        user_chats = self.chats.get(user_id, {})
+        chat = user_chats.pop(chat_id, None)
+        if chat is not None:
+            order = self._order[user_id]
+            del order[bisect_left(order, (chat['last_updated'], chat_id))]
+            for index in self._by_time.values():
+                index.pop((user_id, chat_id), None)
+        if not user_chats:
+            self.chats.pop(user_id, None)
+            self._order.pop(user_id, None)
+
+    def _apply(self, record):
+        op = record['op']
+        at = datetime.fromisoformat(record['at'])
+        user_id, chat_id = record['user_id'], record['chat_id']
+
+        if op == 'add':
+            user_chats = self.chats.setdefault(user_id, {})
+            order = self._order.setdefault(user_id, [])
+            chat = user_chats.get(chat_id)
+            if chat is None:
+                chat = user_chats[chat_id] = {
+                    'messages': [],
+                    'created_at': at,
+                    'title': 'New Chat',
+                    'last_updated': at,
+                    'summary': new_summary()
+                }
+                self._by_time['created_at'][(user_id, chat_id)] = at
+            else:
+                del order[bisect_left(order, (chat['last_updated'], chat_id))]
+            chat['messages'].append(record['message'])
+            chat['last_updated'] = at
+            insort(order, (at, chat_id))
+            by_updated = self._by_time['last_updated']
+            by_updated[(user_id, chat_id)] = at
+            by_updated.move_to_end((user_id, chat_id))
+            update_summary(chat['summary'], record['message'])
+            # Earlier messages never produced a title, so only the new one can
+            if chat['title'] == 'New Chat':
+                chat['title'] = generate_chat_title([record['message']])
+        elif op == 'delete':
+            self._unlink(user_id, chat_id)
+
+    def _append(self, op, user_id, chat_id, **fields):
+        self._seq += 1
+        record = {'seq': self._seq, 'op': op, 'at': datetime.now().isoformat(),
+                  'user_id': user_id, 'chat_id': chat_id, **fields}
+        self._apply(record)
+        self._journal.write(json.dumps(record) + '\n')
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+        self._pending += 1
+        if self._pending >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """Write the full state to the snapshot and truncate the journal"""
+        with self._lock:
+            serializable_history = {}
+            for user_id, user_chats in self.chats.items():
+                serializable_history[user_id] = {}
+                for chat_id, chat_data in user_chats.items():
+                    serializable_history[user_id][chat_id] = {
+                        'messages': chat_data['messages'],
+                        'created_at': chat_data['created_at'].isoformat(),
+                        'title': chat_data['title'],
+                        'last_updated': chat_data['last_updated'].isoformat()
+                    }
+
+            tmp_path = self.snapshot_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'seq': self._seq, 'chats': serializable_history}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+
+            self._journal.truncate(0)
+            self._journal.seek(0)
+            self._pending = 0
+
+    # -- ChatHistoryStore -------------------------------------------------
+
+    def add_message(self, user_id, chat_id, message):
+        with self._lock:
+            self._append('add', user_id, chat_id, message=message)
+
+    def get_chat(self, user_id, chat_id):
+        with self._lock:
+            return self.chats.get(user_id, {}).get(chat_id)
+
+    @staticmethod
+    def _summary(chat_id, chat):
+        summary = chat['summary']
+        return {
+            'chat_id': chat_id,
+            'title': chat['title'],
+            'last_message': summary['last_bot_preview'] or summary['last_preview'],
+            'message_count': summary['message_count'],
+            'created_at': chat['created_at'],
+            'last_updated': chat['last_updated']
+        }
+
+    def get_chat_summary(self, user_id, chat_id):
+        with self._lock:
+            chat = self.chats.get(user_id, {}).get(chat_id)
+            return self._summary(chat_id, chat) if chat is not None else None
+
+    def list_chat_summaries(self, user_id, limit=None, before=None):
+        check_limit(limit)
+        with self._lock:
+            user_chats = self.chats.get(user_id, {})
+            order = self._order.get(user_id, [])
+            end = bisect_left(order, parse_chat_cursor(before)) if before else len(order)
+            start = max(0, end - limit) if limit else 0
+
+            summaries = [self._summary(chat_id, user_chats[chat_id])
+                         for _, chat_id in reversed(order[start:end])]
+            next_before = chat_cursor(*order[start]) if start > 0 else None
+            return summaries, next_before
+
+    def get_messages(self, user_id, chat_id, limit=None, before=None):
+        check_limit(limit)
+        check_message_cursor(before)
+        with self._lock:
+            # The chat may have been deleted or expired since the caller looked it up
+            chat = self.chats.get(user_id, {}).get(chat_id)
+            if chat is None:
+                return [], None
+            messages = chat['messages']
+            end = min(before, len(messages)) if before is not None else len(messages)
+            start = max(0, end - limit) if limit else 0
+            return messages[start:end], (start if start > 0 else None)
+
+    def delete_chat(self, user_id, chat_id):
+        with self._lock:
+            if chat_id not in self.chats.get(user_id, {}):
+                return False
+            self._append('delete', user_id, chat_id)
+            return True
+
+    def expire_chats(self, cutoff, field='created_at', limit=None):
+        if field not in RETENTION_FIELDS:
+            raise ValueError(f"Unknown retention field: {field}")
+        check_limit(limit)
+        with self._lock:
+            expired = []
+            for key, at in self._by_time[field].items():
+                if at >= cutoff or (limit and len(expired) >= limit):
+                    break
+                expired.append(key)
+            # Journaled like any delete; the snapshot is rewritten on the usual compaction schedule
+            for user_id, chat_id in expired:
+                self._append('delete', user_id, chat_id)
+            return len(expired)
+
+    def flush(self):
+        with self._lock:
+            if self._pending:
+                self.compact()
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._journal.close()
+
+
+class SQLiteHistoryStore(ChatHistoryStore):
+    """Chat history stored in a SQLite database shared by every worker process.
+
+    The database runs in WAL mode so readers never block the single writer,
+    and chats are indexed on ``(user_id, last_updated)`` for listing and on
+    ``created_at`` and ``last_updated`` for retention cleanup. Each thread gets its own connection.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS chats (
+            user_id TEXT NOT NULL,
+            chat_id TEXT NOT NULL,
+            title TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            last_updated TEXT NOT NULL,
+            message_count INTEGER NOT NULL DEFAULT 0,
+            last_preview TEXT NOT NULL DEFAULT '',
+            last_bot_preview TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (user_id, chat_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_chats_user_updated ON chats (user_id, last_updated);
+        CREATE INDEX IF NOT EXISTS idx_chats_created ON chats (created_at);
+        CREATE INDEX IF NOT EXISTS idx_chats_updated ON chats (last_updated);
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            chat_id TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            FOREIGN KEY (user_id, chat_id) REFERENCES chats (user_id, chat_id) ON DELETE CASCADE
+        );
+        CREATE INDEX IF NOT EXISTS idx_messages_chat ON messages (user_id, chat_id, id);
+    """
+
+    # Summary columns added after the first release of this backend
+    SUMMARY_COLUMNS = {
+        'message_count': "INTEGER NOT NULL DEFAULT 0",
+        'last_preview': "TEXT NOT NULL DEFAULT ''",
+        'last_bot_preview': "TEXT NOT NULL DEFAULT ''",
+    }
+
+    def __init__(self, db_path, timeout=30.0):
+        self.db_path = db_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections = {}  # thread -> its connection, so close() reaches all of them
+        self._connections_lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        conn = self._connection()
+        conn.executescript(self.SCHEMA)
+        self._migrate(conn)
+
+    def _migrate(self, conn):
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(chats)')}
+        missing = [name for name in self.SUMMARY_COLUMNS if name not in columns]
+        if not missing:
+            return
+
+        def statements(conn):
+            for name in missing:
+                conn.execute(f'ALTER TABLE chats ADD COLUMN {name} {self.SUMMARY_COLUMNS[name]}')
+            conn.execute(
+                'UPDATE chats SET message_count = (SELECT COUNT(*) FROM messages m '
+                'WHERE m.user_id = chats.user_id AND m.chat_id = chats.chat_id)'
+            )
+
+        self._write(statements)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+            self._track(conn)
+        return conn
+
+    def _track(self, conn):
+        """Register this thread's connection, closing those of threads that have finished"""
+        with self._connections_lock:
+            for thread in [t for t in self._connections if not t.is_alive()]:
+                self._connections.pop(thread).close()
+            self._connections[threading.current_thread()] = conn
+
+    def _write(self, statements):
+        """Run ``statements(conn)`` inside an immediate write transaction"""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = statements(conn)
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        return result
+
+    def _messages(self, conn, user_id, chat_id):
+        rows = conn.execute(
+            'SELECT payload FROM messages WHERE user_id = ? AND chat_id = ? ORDER BY id',
+            (user_id, chat_id)
+        )
+        return [json.loads(row['payload']) for row in rows]
+
+    @staticmethod
+    def _summary(row):
+        return {
+            'chat_id': row['chat_id'],
+            'title': row['title'],
+            'last_message': row['last_bot_preview'] or row['last_preview'],
+            'message_count': row['message_count'],
+            'created_at': datetime.fromisoformat(row['created_at']),
+            'last_updated': datetime.fromisoformat(row['last_updated'])
+        }
+
+    @staticmethod
+    def _chat_data(row, messages):
+        return {
+            'messages': messages,
+            'created_at': datetime.fromisoformat(row['created_at']),
+            'title': row['title'],
+            'last_updated': datetime.fromisoformat(row['last_updated'])
+        }
+
+    def add_message(self, user_id, chat_id, message):
+        now = datetime.now().isoformat()
+
+        def statements(conn):
+            conn.execute(
+                "INSERT OR IGNORE INTO chats (user_id, chat_id, title, created_at, last_updated) "
+                "VALUES (?, ?, 'New Chat', ?, ?)",
+                (user_id, chat_id, now, now)
+            )
+            conn.execute(
+                'INSERT INTO messages (user_id, chat_id, payload) VALUES (?, ?, ?)',
+                (user_id, chat_id, json.dumps(message))
+            )
+            # Same rules as update_summary, applied to the stored columns
+            text = message.get('text', '')
+            preview_columns = ''
+            if isinstance(text, str):
+                preview_columns = ', last_preview = :preview'
+                if not message.get('isUser', False):
+                    preview_columns += ', last_bot_preview = :preview'
+            conn.execute(
+                'UPDATE chats SET last_updated = :now, message_count = message_count + 1' + preview_columns +
+                ' WHERE user_id = :user_id AND chat_id = :chat_id',
+                {'now': now, 'user_id': user_id, 'chat_id': chat_id,
+                 'preview': message_preview(text) if isinstance(text, str) else None}
+            )
+            # Earlier messages never produced a title, so only the new one can
+            title = generate_chat_title([message])
+            if title != 'New Chat':
+                conn.execute(
+                    "UPDATE chats SET title = ? WHERE user_id = ? AND chat_id = ? AND title = 'New Chat'",
+                    (title, user_id, chat_id)
+                )
+
+        self._write(statements)
+
+    def get_chat(self, user_id, chat_id):
+        conn = self._connection()
+        row = conn.execute(
+            'SELECT * FROM chats WHERE user_id = ? AND chat_id = ?', (user_id, chat_id)
+        ).fetchone()
+        if row is None:
+            return None
+        return self._chat_data(row, self._messages(conn, user_id, chat_id))
+
+    def get_chat_summary(self, user_id, chat_id):
+        row = self._connection().execute(
+            'SELECT * FROM chats WHERE user_id = ? AND chat_id = ?', (user_id, chat_id)
+        ).fetchone()
+        return self._summary(row) if row is not None else None
+
+    def list_chat_summaries(self, user_id, limit=None, before=None):
+        check_limit(limit)
+        query = 'SELECT * FROM chats WHERE user_id = ?'
+        params = [user_id]
+        if before:
+            before_updated, before_chat_id = parse_chat_cursor(before)
+            query += ' AND (last_updated < ? OR (last_updated = ? AND chat_id < ?))'
+            params += [before_updated.isoformat(), before_updated.isoformat(), before_chat_id]
+        query += ' ORDER BY last_updated DESC, chat_id DESC'
+        if limit:
+            # One extra row tells us whether another page exists
+            query += ' LIMIT ?'
+            params.append(limit + 1)
+
+        rows = self._connection().execute(query, params).fetchall()
+        next_before = None
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            next_before = chat_cursor(datetime.fromisoformat(rows[-1]['last_updated']), rows[-1]['chat_id'])
+        return [self._summary(row) for row in rows], next_before
+
+    def get_messages(self, user_id, chat_id, limit=None, before=None):
+        check_limit(limit)
+        check_message_cursor(before)
+        query = 'SELECT id, payload FROM messages WHERE user_id = ? AND chat_id = ?'
+        params = [user_id, chat_id]
+        if before is not None:
+            query += ' AND id < ?'
+            params.append(before)
+        query += ' ORDER BY id DESC'
+        if limit:
+            query += ' LIMIT ?'
+            params.append(limit + 1)
+
+        rows = self._connection().execute(query, params).fetchall()
+        next_before = None
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            next_before = rows[-1]['id']
+        return [json.loads(row['payload']) for row in reversed(rows)], next_before
+
+    def delete_chat(self, user_id, chat_id):
+        return self._write(lambda conn: conn.execute(
+            'DELETE FROM chats WHERE user_id = ? AND chat_id = ?', (user_id, chat_id)
+        ).rowcount > 0)
+
+    def expire_chats(self, cutoff, field='created_at', limit=None):
+        if field not in RETENTION_FIELDS:
+            raise ValueError(f"Unknown retention field: {field}")
+        check_limit(limit)
+        # Messages go with their chat through ON DELETE CASCADE
+        return self._write(lambda conn: conn.execute(
+            f'DELETE FROM chats WHERE rowid IN (SELECT rowid FROM chats WHERE {field} < ? ORDER BY {field} LIMIT ?)',
+            (cutoff.isoformat(), limit or -1)
+        ).rowcount)
+
+    def close(self):
+        """Close the connection of every thread; only the calling thread may use the store afterwards"""
+        with self._connections_lock:
+            connections, self._connections = list(self._connections.values()), {}
+        for conn in connections:
+            conn.close()
+        self._local.conn = None
+
+
+def create_history_store(data_dir):
+    """Build the chat history backend selected by ``CHAT_HISTORY_BACKEND``"""
+    backend = os.getenv('CHAT_HISTORY_BACKEND', 'journal')
+    if backend == 'journal':
+        return JournalHistoryStore(
+            os.path.join(data_dir, 'chat_history.json'),
+            compact_every=int(os.getenv('CHAT_HISTORY_COMPACT_EVERY', '1000')),
+            fsync=os.getenv('CHAT_HISTORY_FSYNC', '0') == '1'
+        )
+    if backend == 'sqlite':
+        return SQLiteHistoryStore(os.getenv('CHAT_HISTORY_DB', os.path.join(data_dir, 'chat_history.db')))
+    raise ValueError(f"Unknown chat history backend: {backend}")
@@ -0,0 +1,160 @@
+import re
+
+# Intents in priority order: when a message matches several, the first one
+# wins. ``whole_message`` intents only match the entire (normalized) message
+# and ``max_length`` drops an intent for longer messages.
+INTENTS = [
+    {'name': 'emergency', 'keywords': ['emergency', 'urgent', 'severe pain', "can't breathe", 'chest pain', 'heart attack', 'stroke']},
+    {'name': 'reset', 'keywords': ['reset', 'start over', 'clear', 'restart'], 'whole_message': True},
+    {'name': 'greeting', 'keywords': ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening', 'greetings', 'start'], 'max_length': 20},
+    {'name': 'help', 'keywords': ['help', 'how to use', 'instructions', 'guide', 'what can you do', 'how does this work']},
+    {'name': 'thanks', 'keywords': ['thank you', 'thanks', 'appreciate', 'helpful', 'great']},
+    {'name': 'completion', 'keywords': ["that's all", 'done', 'no more', 'that is all', 'finish', 'analyze', 'complete']},
+    {'name': 'negative', 'keywords': ['no', 'nope', 'none', 'no more symptoms'], 'whole_message': True},
+]
+
+
+def normalize_message(message):
+    return " ".join(message.split()).lower()
+
+
+def keyword_pattern(keywords):
+    """Regex source matching any of ``keywords``, factored into a character trie.
+
+    A flat ``a|b|c`` alternation makes ``re`` try every keyword at every
+    position; the trie form tries only the branch for the next character.
+    Spaces inside keywords match any run of whitespace.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [(r'\s+' if char == ' ' else re.escape(char)) + build(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+class IntentRouter:
+    """Classifies a chat message against an intent table in one regex pass.
+
+    All keyword intents are compiled into a single trie-shaped regex
+    anchored on word boundaries, so "hi" no longer fires inside "this".
+    Each match is mapped back to its intent by a dict lookup and ranked by
+    the intent's position in the table; whole-message intents are a dict
+    lookup of the normalized message.
+    """
+
+    def __init__(self, intents=INTENTS):
+        self.names = [intent['name'] for intent in intents]
+        self.max_lengths = [intent.get('max_length') for intent in intents]
+        self._exact, self._keywords = {}, {}
+        for rank, intent in enumerate(intents):
+            target = self._exact if intent.get('whole_message') else self._keywords
+            for keyword in intent['keywords']:
+                target.setdefault(normalize_message(keyword), rank)
+        self._pattern = re.compile(r"(?<!\w)" + keyword_pattern(self._keywords) + r"(?!\w)")
+
+    def classify(self, message):
+        """Name of the highest-priority intent in ``message``, or None"""
+        message = normalize_message(message)
+        best = self._exact.get(message)
+        for match in self._pattern.finditer(message):
+            rank = self._keywords[normalize_message(match.group())]
+            if best is not None and rank >= best:
+                continue
+            max_length = self.max_lengths[rank]
+            if max_length is None or len(message) < max_length:
+                best = rank
+                if best == 0:
+                    break
+        return self.names[best] if best is not None else None
+
+
+# Canned replies, built once at import
+RESPONSES = {
+    'greeting': """👋 **Hello! I'm Dr. AI, your personal health assistant.**
+
+I'm here to help you understand your symptoms and guide you to the right medical care. Think of me as your knowledgeable health companion! 
+
+🩺 **What I can do for you:**
+• Analyze your symptoms with advanced AI
+• Provide detailed health information
+• Recommend appropriate medical specialists
+• Find nearby doctors (if you share your location)
+• Offer preliminary care suggestions
+
+📝 **Let's get started:**
+Simply tell me about your symptoms in your own words. For example:
+• "I have a bad headache and feel nauseous"
+• "My throat is sore and I've been coughing"
+• "I feel dizzy and my chest hurts"
+
+🎯 **The more details you share, the better I can help you!**
+
+What symptoms are you experiencing today?""",
+    'help': """🆘 **How to Get the Best Help from Dr. AI:**
+
+**🔄 Step-by-Step Process:**
+1️⃣ **Describe your symptoms** - Be as specific as possible
+   • Example: "I have a severe headache for 2 days, feel nauseous, and sensitive to light"
+
+2️⃣ **Answer my follow-up questions** - I'll ask about related symptoms to ensure accuracy
+
+3️⃣ **Say "that's all" or "done"** when you've shared everything
+
+4️⃣ **Review my analysis** - I'll provide a detailed assessment with confidence levels
+
+5️⃣ **Find specialists** - Get recommendations for doctors near you
+
+**💡 Pro Tips for Better Results:**
+• Mention how long you've had symptoms
+• Describe severity (mild, moderate, severe)
+• Include any triggers you've noticed
+• Mention relevant medical history if applicable
+
+**🚨 Emergency Note:** For severe symptoms like chest pain, difficulty breathing, or loss of consciousness, please call emergency services immediately!
+
+Ready to start? What symptoms would you like to discuss?""",
+    'thanks': """😊 **You're very welcome!**
+
+I'm glad I could help you understand your symptoms better. Remember, I'm here whenever you need health guidance!
+
+🎯 **Important reminders:**
+• Please follow up with a healthcare professional for official diagnosis
+• Keep track of your symptoms and their progression
+• Don't hesitate to seek immediate care if symptoms worsen
+
+💙 **Take care of yourself!** Your health is your most valuable asset.
+
+Is there anything else about your health I can help you with today?""",
+    'reset': "✨ **Fresh start!** I've cleared our conversation history.\n\nLet's begin again - what symptoms are you experiencing today?",
+    'emergency': """🚨 **EMERGENCY ALERT**
+
+If you're experiencing a medical emergency, please:
+• **Call emergency services immediately** (911, 999, or your local emergency number)
+• **Go to the nearest emergency room**
+• **Don't delay - seek immediate medical attention**
+
+I'm an AI assistant and cannot provide emergency medical care. Your safety is the top priority!
+
+Once you're safe and if you need non-emergency health guidance, I'll be here to help.""",
+}
+
+NO_SYMPTOMS_TO_ANALYZE = "🤔 **I don't have any symptoms to analyze yet.**\n\nCould you please describe what you're experiencing? For example:\n• 'I have a headache and feel tired'\n• 'My stomach hurts and I feel nauseous'\n• 'I have a fever and sore throat'"
+UNDERSTOOD = "👍 **Understood!** \n\nAny other symptoms you'd like to mention? Or say **'that's all'** if you're ready for my analysis."
+NO_SYMPTOMS_YET = "🤔 **No symptoms noted yet.**\n\nWhat brings you here today? Please describe any health concerns or symptoms you're experiencing."
+LISTENING = "👂 **I'm listening!**\n\nAny other symptoms to add? Or say **'that's all'** when you're ready for my analysis."
+ENCOURAGEMENT_RESPONSES = [
+    "🔍 **I'd love to help, but I need a bit more information.**\n\nCould you describe your symptoms more specifically? What exactly are you feeling or experiencing?",
+    "💬 **Let's try a different approach.**\n\nInstead of general terms, can you tell me about specific physical sensations? For example:\n• Where does it hurt?\n• How do you feel overall?\n• What's bothering you most?",
+    "🎯 **I'm here to help you!**\n\nTry describing your symptoms like you would to a friend: 'I have...' or 'I feel...' or 'It hurts when...'"
+]
@@ -1,53 +1,241 @@
 # llm_client.py
+import logging
 import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 
 HUGGINGFACE_API_TOKEN = os.getenv("HUGGINGFACE_API_TOKEN")
-API_URL = "https://api-inference.huggingface.co/models/HuggingFaceH4/zephyr-7b-beta"
+API_URL = os.getenv("LLM_API_URL", "https://api-inference.huggingface.co/models/HuggingFaceH4/zephyr-7b-beta")
 HEADERS = {"Authorization": f"Bearer {HUGGINGFACE_API_TOKEN}"}
 
-def query_llm(prompt):
-    # If no token is provided, return a simple fallback response
-    if not HUGGINGFACE_API_TOKEN or HUGGINGFACE_API_TOKEN == "YOUR_HUGGINGFACE_TOKEN":
-        return f"I understand you're experiencing: {prompt.split(':')[-1].strip()}. Could you please describe your symptoms more clearly?"
-    
-    payload = {
-        "inputs": prompt,
-        "parameters": {
-            "max_new_tokens": 150,
-            "temperature": 0.7,
-            "top_p": 0.95,
-            "do_sample": True,
-        }
-    }
-    
-    try:
-        response = requests.post(API_URL, headers=HEADERS, json=payload, timeout=10)
-        if response.status_code != 200:
-            print(f"LLM API error {response.status_code}:", response.text)
-            return "Could you please describe your symptoms more clearly?"
-
-        result = response.json()
-        
+FALLBACK_RESPONSE = "Could you please describe your symptoms more clearly?"
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+DEFAULT_PARAMETERS = {
+    "max_new_tokens": 150,
+    "temperature": 0.7,
+    "top_p": 0.95,
+    "do_sample": True,
+}
+
+def normalize_prompt(prompt):
+    """Cache key form of a prompt: case-folded with whitespace collapsed"""
+    return re.sub(r"\s+", " ", prompt).strip().lower()
+
+class TTLCache:
+    """LRU cache whose entries also expire ``ttl`` seconds after being stored"""
+
+    def __init__(self, maxsize=512, ttl=600, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (value, self._clock() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+class CircuitBreaker:
+    """Stops calling a failing upstream for ``reset_timeout`` seconds.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls are refused without touching the network. Once the timeout passes
+    one trial call is let through (half-open): success closes the circuit,
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self._clock() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = self._clock()
+            self._trial_in_flight = False
+
+class LLMClient:
+    """Text-generation client for the Hugging Face inference API.
+
+    One pooled ``requests.Session`` is shared by all callers, at most
+    ``max_concurrency`` requests are in flight (callers that cannot get a
+    slot within ``acquire_timeout`` get the fallback answer instead of
+    queueing), transient errors are retried with exponential backoff and
+    jitter, a circuit breaker sheds load while the API is down, and answers
+    are cached by normalized prompt. ``query_async`` runs a query on a small
+    executor so a request handler can keep working and wait with a deadline.
+    """
+
+    def __init__(self, api_url=API_URL, token=HUGGINGFACE_API_TOKEN, timeout=10, max_concurrency=4,
+                 acquire_timeout=2.0, max_retries=2, backoff=0.5, cache=None, breaker=None):
+        self.api_url = api_url
+        self.token = token
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.acquire_timeout = acquire_timeout
+        self.cache = cache if cache is not None else TTLCache()
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Authorization": f"Bearer {token}"})
+
+    @property
+    def enabled(self):
+        return bool(self.token) and self.token != "YOUR_HUGGINGFACE_TOKEN"
+
+    def query(self, prompt, parameters=None):
+        # If no token is provided, return a simple fallback response
+        if not self.enabled:
+            return f"I understand you're experiencing: {prompt.split(':')[-1].strip()}. Could you please describe your symptoms more clearly?"
+
+        parameters = {**DEFAULT_PARAMETERS, **(parameters or {})}
+        key = (normalize_prompt(prompt), tuple(sorted(parameters.items())))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            logger.warning("LLM concurrency limit reached; using fallback response")
+            return FALLBACK_RESPONSE
+        try:
+            # The breaker is asked only once a slot is held, so a half-open
+            # trial it hands out is always resolved as a success or failure
+            if not self.breaker.allow():
+                logger.warning("LLM circuit open; using fallback response")
+                return FALLBACK_RESPONSE
+            result = None
+            try:
+                result = self._post_with_retries({"inputs": prompt, "parameters": parameters})
+            finally:
+                if result is None:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+        finally:
+            self._slots.release()
+
+        if result is None:
+            return FALLBACK_RESPONSE
+        answer = self._parse(prompt, result)
+        if answer != FALLBACK_RESPONSE:
+            self.cache.put(key, answer)
+        return answer
+
+    def query_async(self, prompt, parameters=None):
+        """Run :meth:`query` on the client's executor; returns a ``Future``"""
+        return self._executor.submit(self.query, prompt, parameters)
+
+    def _post_with_retries(self, payload):
+        """Response JSON, or None once retries are exhausted or the error is not retryable"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(self.api_url, json=payload, timeout=self.timeout)
+                if response.status_code == 200:
+                    return response.json()
+                logger.warning("LLM API error %s: %s", response.status_code, response.text[:200],
+                               extra={'attempt': attempt})
+                if response.status_code not in RETRYABLE_STATUS:
+                    return None
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                logger.warning("LLM request error (retryable): %s", e, extra={'attempt': attempt})
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.error("LLM request error: %s", e, extra={'attempt': attempt})
+                return None
+            if attempt < self.max_retries:
+                time.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+        return None
+
+    @staticmethod
+    def _parse(prompt, result):
         # Handle different response formats
         if isinstance(result, list) and len(result) > 0:
-            if "generated_text" in result[0]:
+            if isinstance(result[0], dict) and "generated_text" in result[0]:
                 generated = result[0]["generated_text"]
                 # Remove the original prompt from the response
                 if prompt in generated:
                     generated = generated.replace(prompt, "").strip()
-                return generated if generated else "Could you please describe your symptoms more clearly?"
-            else:
-                return str(result[0]) if result[0] else "Could you please describe your symptoms more clearly?"
-        else:
-            return "Could you please describe your symptoms more clearly?"
-            
-    except requests.exceptions.RequestException as e:
-        print(f"LLM request error: {e}")
-        return "Could you please describe your symptoms more clearly?"
-    except Exception as e:
-        print(f"LLM processing error: {e}")
-        return "Could you please describe your symptoms more clearly?"
+                return generated if generated else FALLBACK_RESPONSE
+            return str(result[0]) if result[0] else FALLBACK_RESPONSE
+        return FALLBACK_RESPONSE
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_client():
+    """Process-wide client, created on first use"""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = LLMClient()
+    return _default_client
+
+def query_llm(prompt):
+    return get_client().query(prompt)
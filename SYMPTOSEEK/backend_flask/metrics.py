@@ -0,0 +1,193 @@
+import bisect
+import threading
+import time
+from contextlib import ContextDecorator
+
+# Latency buckets in seconds, from sub-millisecond lookups to slow requests
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') for _, v in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Metric:
+    """Base for metrics with a fixed set of label names; one series per label value tuple"""
+
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return tuple(str(label) for label in labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for labels, value in series:
+            lines.extend(self._samples(labels, value))
+        return lines
+
+
+class Counter(Metric):
+    type_name = 'counter'
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, *labels):
+        return self._series.get(self._key(labels), 0)
+
+    def _samples(self, labels, value):
+        return [f"{self.name}_total{format_labels(self.labelnames, labels)} {format_value(value)}"]
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram; each series stores per-bucket counts, sum and count"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labels):
+        """Context manager / decorator observing the elapsed wall time"""
+        return _Timer(self, labels)
+
+    def count(self, *labels):
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def _samples(self, labels, series):
+        counts, total, count = series
+        lines, cumulative = [], 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            bucket_labels = format_labels(self.labelnames, labels, [('le', format_value(float(bound)))])
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+        label_text = format_labels(self.labelnames, labels)
+        lines.append(f"{self.name}_sum{label_text} {format_value(total)}")
+        lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+class _Timer(ContextDecorator):
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def _recreate_cm(self):
+        # A decorated function gets a fresh timer per call, so concurrent calls don't share a start time
+        return _Timer(self.histogram, self.labels)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self._start, *self.labels)
+        return False
+
+
+class CallbackMetric(Metric):
+    """Gauge or counter whose samples are read at scrape time from ``fn()``,
+    a dict of label value tuple -> number (None or a failure renders no samples)"""
+
+    def __init__(self, name, documentation, fn, labelnames=(), type_name='gauge'):
+        super().__init__(name, documentation, labelnames)
+        self._fn = fn
+        self.type_name = type_name
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        try:
+            samples = self._fn() or {}
+        except Exception:
+            return lines
+        for labels, value in sorted(samples.items()):
+            lines.append(f"{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in the Prometheus text exposition format"""
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name, documentation, fn, labelnames=(), type_name='gauge'):
+        return self.register(CallbackMetric(name, documentation, fn, labelnames, type_name))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def timed_iter(iterable, histogram, *labels):
+    """Yield from ``iterable``, observing only the time spent producing items.
+
+    Time the consumer spends between items (writing history, streaming to
+    the client) is not counted, so a generator stage is measured on its own.
+    """
+    iterator = iter(iterable)
+    elapsed = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                elapsed += time.perf_counter() - start
+                break
+            elapsed += time.perf_counter() - start
+            yield item
+    finally:
+        histogram.observe(elapsed, *labels)
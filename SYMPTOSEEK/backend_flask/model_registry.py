@@ -0,0 +1,221 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+
+import joblib
+
+from forest_engine import ForestEngine, artifact_exists, export_forest
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILE = 'best_rf_model.joblib'
+ENCODER_FILE = 'label_encoder.joblib'
+FOREST_DIR = 'forest'
+METADATA_FILE = 'metadata.json'
+CURRENT_FILE = 'CURRENT'
+
+
+class FeatureMismatchError(ValueError):
+    """The model was trained on different feature columns than the API encodes"""
+
+
+class ModelBundle:
+    """A classifier, its label encoder, metadata and disease knowledge, swapped in and out as one unit.
+
+    Request handlers read the bundle once and use that reference throughout,
+    so a reload never mixes a new model with an old encoder or with a
+    knowledge table built for other classes mid-request. ``knowledge`` is
+    attached by the server before the bundle is published.
+    """
+
+    def __init__(self, version, model, label_encoder, metadata, knowledge=None):
+        self.version = version
+        self.model = model
+        self.label_encoder = label_encoder
+        self.metadata = metadata
+        self.knowledge = knowledge
+
+    @property
+    def features(self):
+        return self.metadata.get('features') or []
+
+    def validate_features(self, features):
+        """Raise :class:`FeatureMismatchError` unless the model expects exactly ``features``, in order"""
+        expected = list(self.features)
+        features = list(features)
+        if expected == features:
+            return
+        missing = [f for f in features if f not in set(expected)]
+        extra = [f for f in expected if f not in set(features)]
+        detail = f"missing {missing[:5]}, unexpected {extra[:5]}" if missing or extra else "same columns in a different order"
+        raise FeatureMismatchError(
+            f"Model {self.version} expects {len(expected)} features but the symptom list has {len(features)}: {detail}"
+        )
+
+    def summary(self):
+        return {
+            'version': self.version,
+            'created_at': self.metadata.get('created_at'),
+            'data_hash': self.metadata.get('data_hash'),
+            'metrics': self.metadata.get('metrics', {}),
+            'n_features': len(self.features),
+            'n_classes': len(self.label_encoder.classes_),
+            'engine': type(self.model).__name__,
+        }
+
+
+def load_artifacts(directory, version, metadata=None):
+    """Load a model directory, preferring its memory-mapped forest export"""
+    joblib_path = os.path.join(directory, MODEL_FILE)
+    forest_dir = os.path.join(directory, FOREST_DIR)
+    model = None
+    if artifact_exists(forest_dir):
+        if os.path.exists(joblib_path) and os.path.getmtime(joblib_path) > os.path.getmtime(os.path.join(forest_dir, 'meta.json')):
+            logger.warning("%s is older than %s; re-run forest_engine.py. Using joblib model", forest_dir, MODEL_FILE)
+        else:
+            model = ForestEngine.load(forest_dir)
+    if model is None:
+        model = joblib.load(joblib_path)
+    label_encoder = joblib.load(os.path.join(directory, ENCODER_FILE))
+
+    if metadata is None:
+        metadata = {}
+    metadata.setdefault('features', [str(f) for f in getattr(model, 'feature_names_in_', [])])
+    return ModelBundle(version, model, label_encoder, metadata)
+
+
+class ModelRegistry:
+    """Versioned model artifacts under ``root``, one directory per version.
+
+    Each version holds the joblib model, label encoder, forest export and a
+    ``metadata.json`` (data hash, metrics, feature list, classes). Versions
+    are written to a temporary directory and renamed into place, and the
+    active version is a ``CURRENT`` pointer file replaced atomically, so
+    readers never see a half-published model.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _path(self, version):
+        return os.path.join(self.root, version)
+
+    def versions(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, METADATA_FILE))
+        )
+
+    def current_version(self):
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE), 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def metadata(self, version):
+        with open(os.path.join(self._path(version), METADATA_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def activate(self, version):
+        if version not in self.versions():
+            raise KeyError(f"Unknown model version: {version}")
+        with self._lock:
+            tmp_path = os.path.join(self.root, CURRENT_FILE + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(version)
+            os.replace(tmp_path, os.path.join(self.root, CURRENT_FILE))
+
+    def publish(self, model, label_encoder, metadata=None, version=None, activate=True):
+        """Write a new version (model, encoder, forest export, metadata) and optionally activate it"""
+        version = version or datetime.now().strftime('%Y%m%d-%H%M%S')
+        if os.path.exists(self._path(version)):
+            raise FileExistsError(f"Model version already exists: {version}")
+        metadata = dict(metadata or {})
+        metadata.update({
+            'version': version,
+            'created_at': metadata.get('created_at') or datetime.now().isoformat(),
+            'features': [str(f) for f in getattr(model, 'feature_names_in_', [])],
+            'classes': [str(c) for c in label_encoder.classes_],
+        })
+
+        os.makedirs(self.root, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=f'.{version}-', dir=self.root)
+        try:
+            joblib.dump(model, os.path.join(staging, MODEL_FILE))
+            joblib.dump(label_encoder, os.path.join(staging, ENCODER_FILE))
+            export_forest(model, os.path.join(staging, FOREST_DIR))
+            with open(os.path.join(staging, METADATA_FILE), 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, indent=2)
+            os.rename(staging, self._path(version))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        if activate:
+            self.activate(version)
+        print(f"📦 Published model {version}" + (" (active)" if activate else ""))
+        return version
+
+    def load(self, version=None):
+        """Bundle for ``version`` (default: the active one).
+
+        Only published versions are loaded: the name is checked against
+        :meth:`versions` before anything is unpickled, so a version string
+        from a request can never point outside the registry.
+        """
+        version = version or self.current_version()
+        if version is None:
+            raise FileNotFoundError(f"No active model version in {self.root}")
+        if version not in self.versions():
+            raise KeyError(f"Unknown model version: {version}")
+        return load_artifacts(self._path(version), version, self.metadata(version))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and manage the versioned model registry")
+    parser.add_argument('--root', default='models/registry')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help="list versions and their metrics")
+    activate = commands.add_parser('activate', help="point CURRENT at a version (then reload the API)")
+    activate.add_argument('version')
+    add = commands.add_parser('import', help="publish a plain directory with best_rf_model.joblib + label_encoder.joblib")
+    add.add_argument('directory')
+    add.add_argument('--version')
+    add.add_argument('--no-activate', action='store_true')
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root)
+    if args.command == 'list':
+        current = registry.current_version()
+        for version in registry.versions():
+            meta = registry.metadata(version)
+            marker = '*' if version == current else ' '
+            print(f"{marker} {version}  {json.dumps(meta.get('metrics', {}))}")
+    elif args.command == 'activate':
+        registry.activate(args.version)
+        print(f"✅ Active model is now {args.version}")
+    else:
+        model = joblib.load(os.path.join(args.directory, MODEL_FILE))
+        label_encoder = joblib.load(os.path.join(args.directory, ENCODER_FILE))
+        metadata = {'source': os.path.abspath(args.directory)}
+        for report in ('search_report.json', 'compression_report.json'):
+            report_path = os.path.join(args.directory, report)
+            if os.path.exists(report_path):
+                with open(report_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                metadata['data_hash'] = data.get('data_hash')
+                metadata['metrics'] = {'test_accuracy': data.get('test_accuracy') or (data.get('chosen') or {}).get('test_accuracy')}
+        registry.publish(model, label_encoder, metadata, version=args.version, activate=not args.no_activate)
+
+
+if __name__ == '__main__':
+    main()
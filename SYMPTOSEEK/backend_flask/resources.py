@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class LazyResource:
+    """A value built on first use, exactly once, no matter how many threads ask.
+
+    A failed load is not cached: the error is recorded for the readiness
+    report and the next ``get()`` tries again.
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._value = None
+        self._loaded = False
+        self.load_seconds = None
+        self.error = None
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def get(self):
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                start = time.perf_counter()
+                try:
+                    value = self._loader()
+                except Exception as e:
+                    self.error = f"{type(e).__name__}: {e}"
+                    logger.error("Failed to load %s: %s", self.name, self.error)
+                    raise
+                self.load_seconds = time.perf_counter() - start
+                self.error = None
+                self._value = value
+                self._loaded = True
+                logger.info("Loaded %s in %.1f ms", self.name, self.load_seconds * 1000,
+                            extra={'resource': self.name, 'load_ms': round(self.load_seconds * 1000, 1)})
+        return self._value
+
+    def set(self, value):
+        """Replace the value (e.g. after a reload) without going through the loader"""
+        with self._lock:
+            self._value = value
+            self._loaded = True
+            self.error = None
+
+    def status(self):
+        return {
+            "loaded": self._loaded,
+            "load_ms": round(self.load_seconds * 1000, 1) if self.load_seconds is not None else None,
+            "error": self.error
+        }
+
+
+class ResourceRegistry:
+    """Named lazy resources shared by the request handlers.
+
+    Loaders may depend on other resources by reading them from the registry;
+    each one is still built once. ``warm_up`` loads everything up front
+    (optionally in a background thread) and logs a timing breakdown.
+    """
+
+    def __init__(self):
+        self._resources = {}
+        self._warmup_thread = None
+
+    def register(self, name, loader):
+        self._resources[name] = LazyResource(name, loader)
+        return self._resources[name]
+
+    def resource(self, name):
+        """Decorator registering a loader function under ``name``"""
+        def decorator(loader):
+            self.register(name, loader)
+            return loader
+        return decorator
+
+    def __getitem__(self, name):
+        return self._resources[name].get()
+
+    def __contains__(self, name):
+        return name in self._resources
+
+    def get(self, name):
+        return self._resources[name]
+
+    def available(self, *names):
+        """Load ``names`` if needed; False (instead of raising) if any of them fails"""
+        try:
+            for name in names:
+                self._resources[name].get()
+        except Exception:
+            return False
+        return True
+
+    def warm_up(self, names=None):
+        """Load every resource (or ``names``), logging the per-resource breakdown"""
+        start = time.perf_counter()
+        for name in names or list(self._resources):
+            try:
+                self._resources[name].get()
+            except Exception:
+                pass
+        total_ms = (time.perf_counter() - start) * 1000
+        breakdown = ", ".join(
+            f"{name}={res.status()['load_ms']}ms" for name, res in self._resources.items() if res.loaded
+        )
+        logger.info("Warm-up finished in %.1f ms (%s)", total_ms, breakdown)
+        return self.ready()
+
+    def warm_up_in_background(self):
+        if self._warmup_thread is None:
+            self._warmup_thread = threading.Thread(target=self.warm_up, name='resource-warmup', daemon=True)
+            self._warmup_thread.start()
+        return self._warmup_thread
+
+    def ready(self):
+        return all(res.loaded for res in self._resources.values())
+
+    def status(self):
+        return {name: res.status() for name, res in self._resources.items()}
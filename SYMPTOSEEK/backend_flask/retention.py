@@ -0,0 +1,93 @@
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+from history_store import RETENTION_FIELDS
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionPolicy:
+    """How long chats are kept and how the sweeper paces itself.
+
+    Chats whose ``field`` (``created_at`` or ``last_updated``) is older than
+    ``max_age`` are expired ``batch_size`` at a time, every ``interval``
+    seconds.
+    """
+
+    def __init__(self, max_age=timedelta(days=3), field='created_at', batch_size=500, interval=300):
+        if field not in RETENTION_FIELDS:
+            raise ValueError(f"Unknown retention field: {field}")
+        # A batch size of 0 would mean "no limit" to the store and never end a sweep
+        if batch_size < 1:
+            raise ValueError(f"Retention batch size must be at least 1, got {batch_size}")
+        if interval <= 0:
+            raise ValueError(f"Retention interval must be positive, got {interval}")
+        self.max_age = max_age
+        self.field = field
+        self.batch_size = batch_size
+        self.interval = interval
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_age=timedelta(days=float(os.getenv('CHAT_RETENTION_DAYS', '3'))),
+            field=os.getenv('CHAT_RETENTION_FIELD', 'created_at'),
+            batch_size=int(os.getenv('CHAT_RETENTION_BATCH_SIZE', '500')),
+            interval=float(os.getenv('CHAT_RETENTION_INTERVAL_SECONDS', '300')),
+        )
+
+
+class RetentionWorker:
+    """Background thread that expires old chats from a history store.
+
+    Each sweep removes expired chats in batches, one store call (and one
+    hold of the store's lock) per batch, so requests are never blocked for
+    longer than a batch takes. The store's time-ordered index makes each
+    batch cost proportional to the chats it removes.
+    """
+
+    def __init__(self, store, policy=None, clock=datetime.now):
+        self.store = store
+        self.policy = policy or RetentionPolicy()
+        self._clock = clock
+        self._stop = threading.Event()
+        self._thread = None
+        self.total_expired = 0
+        self.last_sweep_at = None
+
+    def sweep(self):
+        """Expire every chat past the cutoff and return how many were removed"""
+        cutoff = self._clock() - self.policy.max_age
+        removed = 0
+        while not self._stop.is_set():
+            batch = self.store.expire_chats(cutoff, self.policy.field, self.policy.batch_size)
+            removed += batch
+            if batch < self.policy.batch_size:
+                break
+        self.total_expired += removed
+        self.last_sweep_at = self._clock()
+        if removed:
+            logger.info("Expired %d chats with %s before %s", removed, self.policy.field, cutoff.isoformat(timespec='seconds'))
+        return removed
+
+    def _run(self):
+        while True:
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Chat retention sweep failed")
+            if self._stop.wait(self.policy.interval):
+                return
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='chat-retention', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,291 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def session_key(user_id, chat_id):
+    """Store key for one conversation of one user"""
+    return json.dumps([user_id, chat_id])
+
+
+class SessionStore:
+    """Interface shared by the symptom-collection session backends.
+
+    A session is a small JSON-serializable dict stored under a string key.
+    All changes go through :meth:`update`, which runs a read-modify-write
+    atomically for that key, so concurrent requests for one conversation
+    never lose each other's symptoms. Sessions idle for longer than ``ttl``
+    seconds are treated as gone and eventually evicted.
+    """
+
+    def update(self, key, fn):
+        """Atomically replace the session with ``fn(session)``.
+
+        ``fn`` receives the current session (None if there is none) and
+        returns ``(new_session, result)``; a ``new_session`` of None deletes
+        the key. Returns ``result``.
+        """
+        raise NotImplementedError
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def stats(self):
+        """Active session count and how many sessions were dropped by idle expiry or the entry cap"""
+        return {
+            'backend': self.backend,
+            'active_sessions': len(self),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'expired': self.expired,
+            'evicted': self.evicted,
+        }
+
+    def close(self):
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """Sessions for a single process, kept in least-recently-used order.
+
+    Updates hold a lock for their key only, so different conversations never
+    wait on each other; the shared ordering is touched under a short global
+    lock. Because the order is by last access, idle sessions sit at the
+    front: writes pop expired ones from there, then the least recently used
+    ones while more than ``max_entries`` remain.
+    """
+
+    backend = 'memory'
+
+    def __init__(self, ttl=3600, max_entries=10000, clock=time.time):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.expired = 0
+        self.evicted = 0
+        self._clock = clock
+        self._sessions = OrderedDict()  # key -> (session, last_access)
+        self._lock = threading.Lock()
+        self._key_locks = {}  # key -> [lock, number of threads using it]
+
+    def _acquire(self, key):
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        entry[0].acquire()
+        return entry
+
+    def _release(self, key, entry):
+        entry[0].release()
+        with self._lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._key_locks[key]
+
+    def _live(self, key, now):
+        item = self._sessions.get(key)
+        if item is None:
+            return None
+        if now - item[1] > self.ttl:
+            del self._sessions[key]
+            self.expired += 1
+            return None
+        return item[0]
+
+    def _evict(self, now):
+        while self._sessions:
+            key, (_, last_access) = next(iter(self._sessions.items()))
+            if now - last_access > self.ttl:
+                self.expired += 1
+            elif len(self._sessions) > self.max_entries:
+                self.evicted += 1
+            else:
+                break
+            self._sessions.popitem(last=False)
+
+    def update(self, key, fn):
+        entry = self._acquire(key)
+        try:
+            with self._lock:
+                session = self._live(key, self._clock())
+            new_session, result = fn(session)
+            with self._lock:
+                now = self._clock()
+                if new_session is None:
+                    self._sessions.pop(key, None)
+                else:
+                    self._sessions[key] = (new_session, now)
+                    self._sessions.move_to_end(key)
+                    self._evict(now)
+            return result
+        finally:
+            self._release(key, entry)
+
+    def get(self, key):
+        with self._lock:
+            return self._live(key, self._clock())
+
+    def delete(self, key):
+        entry = self._acquire(key)
+        try:
+            with self._lock:
+                self._sessions.pop(key, None)
+        finally:
+            self._release(key, entry)
+
+    def __len__(self):
+        with self._lock:
+            # Drop the expired sessions at the front so only live ones are counted
+            self._evict(self._clock())
+            return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in a SQLite database shared by every worker process.
+
+    Each update is one ``BEGIN IMMEDIATE`` transaction, which serializes
+    writers across processes for the few microseconds the read-modify-write
+    takes. Expired rows are ignored on read and, together with the oldest
+    rows beyond ``max_entries``, deleted every ``prune_every`` writes using
+    the index on ``updated_at``. Each thread gets its own connection.
+    The expiry and eviction counters only cover this process's prunes.
+    """
+
+    backend = 'sqlite'
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            key TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions (updated_at);
+    """
+
+    def __init__(self, db_path, ttl=3600, max_entries=10000, prune_every=100, timeout=30.0, clock=time.time):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self.expired = 0
+        self.evicted = 0
+        self.timeout = timeout
+        self._clock = clock
+        self._local = threading.local()
+        self._connections = {}  # thread -> its connection, so close() reaches all of them
+        self._connections_lock = threading.Lock()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._track(conn)
+        return conn
+
+    def _track(self, conn):
+        """Register this thread's connection, closing those of threads that have finished"""
+        with self._connections_lock:
+            for thread in [t for t in self._connections if not t.is_alive()]:
+                self._connections.pop(thread).close()
+            self._connections[threading.current_thread()] = conn
+
+    def _read(self, conn, key, now):
+        row = conn.execute('SELECT data FROM sessions WHERE key = ? AND updated_at >= ?',
+                           (key, now - self.ttl)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, key, fn):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            now = self._clock()
+            new_session, result = fn(self._read(conn, key, now))
+            if new_session is None:
+                conn.execute('DELETE FROM sessions WHERE key = ?', (key,))
+            else:
+                conn.execute(
+                    'INSERT INTO sessions (key, data, updated_at) VALUES (?, ?, ?) '
+                    'ON CONFLICT(key) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at',
+                    (key, json.dumps(new_session), now)
+                )
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+        with self._writes_lock:
+            self._writes += 1
+            prune = self._writes % self.prune_every == 0
+        if prune:
+            self.prune()
+        return result
+
+    def prune(self):
+        """Delete expired sessions and the least recently updated ones beyond ``max_entries``"""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            expired = conn.execute('DELETE FROM sessions WHERE updated_at < ?', (self._clock() - self.ttl,)).rowcount
+            evicted = conn.execute(
+                'DELETE FROM sessions WHERE key IN (SELECT key FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            ).rowcount
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        with self._writes_lock:
+            self.expired += expired
+            self.evicted += evicted
+
+    def get(self, key):
+        return self._read(self._connection(), key, self._clock())
+
+    def delete(self, key):
+        self._connection().execute('DELETE FROM sessions WHERE key = ?', (key,))
+
+    def __len__(self):
+        return self._connection().execute(
+            'SELECT COUNT(*) FROM sessions WHERE updated_at >= ?', (self._clock() - self.ttl,)
+        ).fetchone()[0]
+
+    def close(self):
+        """Close the connection of every thread; only the calling thread may use the store afterwards"""
+        with self._connections_lock:
+            connections, self._connections = list(self._connections.values()), {}
+        for conn in connections:
+            conn.close()
+        self._local.conn = None
+
+
+def create_session_store(data_dir):
+    """Build the session backend selected by ``SESSION_BACKEND``.
+
+    ``memory`` (the default) only works with a single worker process; use
+    ``sqlite`` when running several workers.
+    """
+    backend = os.getenv('SESSION_BACKEND', 'memory')
+    ttl = float(os.getenv('SESSION_TTL_SECONDS', '3600'))
+    max_entries = int(os.getenv('SESSION_MAX_ENTRIES', '10000'))
+    if backend == 'memory':
+        return MemorySessionStore(ttl=ttl, max_entries=max_entries)
+    if backend == 'sqlite':
+        return SQLiteSessionStore(os.getenv('SESSION_DB', os.path.join(data_dir, 'sessions.db')),
+                                  ttl=ttl, max_entries=max_entries)
+    raise ValueError(f"Unknown session backend: {backend}")
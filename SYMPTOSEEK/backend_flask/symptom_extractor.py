@@ -0,0 +1,114 @@
+import json
+import logging
+import re
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+def tokenize(text):
+    """Lowercase word tokens; apostrophes stay inside words (``can't``)"""
+    return _TOKEN.findall(text.lower())
+
+
+def load_synonyms(path):
+    """Read the ``{symptom: [colloquial phrase, ...]}`` synonym table"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class SymptomExtractor:
+    """Finds symptom phrases in free text with one Aho-Corasick pass over tokens.
+
+    Phrases are compiled once into a token-level automaton, so a message is
+    scanned a single time regardless of how many dataset symptoms and
+    synonyms are registered, and matches always fall on word boundaries.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._compiled = True
+
+    @classmethod
+    def build(cls, features, synonyms=None, encoder=None):
+        """Compile dataset feature names plus a synonym table.
+
+        Features are matched by their own words (underscores read as spaces).
+        When several features share the same words the underscore spelling,
+        which the old PhraseMatcher produced, is kept. Synonym targets are
+        resolved through ``encoder`` and skipped if they are not features.
+        """
+        extractor = cls()
+        by_tokens = {}
+        for feature in features:
+            tokens = tuple(tokenize(feature.replace('_', ' ')))
+            if tokens and (tokens not in by_tokens or feature == '_'.join(tokens)):
+                by_tokens[tokens] = feature
+        for tokens, feature in by_tokens.items():
+            extractor.add(tokens, feature)
+
+        for symptom, phrases in (synonyms or {}).items():
+            target = encoder.canonical(symptom) if encoder is not None else symptom
+            if target is None:
+                logger.warning("Skipping synonyms for unknown symptom: %s", symptom)
+                continue
+            for phrase in phrases:
+                extractor.add(tokenize(phrase), target)
+
+        extractor.compile()
+        return extractor
+
+    def add(self, tokens, symptom):
+        """Register a token sequence that reports ``symptom`` when found"""
+        node = 0
+        for token in tokens:
+            next_node = self._goto[node].get(token)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][token] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = next_node
+        if symptom not in self._out[node]:
+            self._out[node].append(symptom)
+        self._compiled = False
+
+    def compile(self):
+        """Compute failure links breadth-first and merge outputs along them"""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(token, 0)
+                for symptom in self._out[self._fail[child]]:
+                    if symptom not in self._out[child]:
+                        self._out[child].append(symptom)
+        self._compiled = True
+
+    def extract(self, text):
+        """Symptoms mentioned in ``text``, deduplicated in order of appearance"""
+        if not self._compiled:
+            self.compile()
+        goto, fail, out = self._goto, self._fail, self._out
+
+        found = {}
+        node = 0
+        for token in tokenize(text):
+            while node and token not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(token, 0)
+            for symptom in out[node]:
+                found.setdefault(symptom, None)
+        return list(found)
@@ -0,0 +1,55 @@
+import numpy as np
+
+
+class SymptomCooccurrenceIndex:
+    """Symptom x symptom co-occurrence index used for follow-up questions.
+
+    ``counts[i, j]`` is the number of training rows in which symptoms ``i``
+    and ``j`` are both present. Scores are the counts, optionally multiplied
+    by the severity of the candidate symptom, and every row is ranked once
+    at build time so a lookup only walks the head of one ranked row.
+    """
+
+    def __init__(self, symptoms, counts, weights=None):
+        self.symptoms = list(symptoms)
+        self.positions = {symptom: i for i, symptom in enumerate(self.symptoms)}
+        self.counts = counts
+
+        scores = counts * weights[np.newaxis, :] if weights is not None else counts.astype(np.float64)
+        np.fill_diagonal(scores, 0)
+        order = np.argsort(-scores, axis=1, kind='stable')
+        # Keep only symptoms that actually co-occur
+        self._ranked = [row[scores[i, row] > 0] for i, row in enumerate(order)]
+
+    @classmethod
+    def from_training(cls, training_df, symptoms, severity_df=None):
+        """Build the index from the one-hot ``Training.csv`` frame.
+
+        When ``severity_df`` (``symptom_severity.csv``) is given, candidates are
+        weighted by severity; symptoms without a rating get the mean severity.
+        """
+        presence = training_df[symptoms].to_numpy(dtype=np.int32)
+        counts = presence.T @ presence
+
+        weights = None
+        if severity_df is not None:
+            severity = dict(zip(severity_df['Symptom'].str.strip(), severity_df['Symptom_severity']))
+            default = float(np.mean(list(severity.values()))) if severity else 1.0
+            weights = np.array([float(severity.get(s, default)) for s in symptoms])
+        return cls(symptoms, counts, weights)
+
+    def related(self, symptom, exclude=(), k=3):
+        """Return up to ``k`` symptoms most associated with ``symptom``, skipping ``exclude``"""
+        position = self.positions.get(symptom)
+        if position is None:
+            return []
+
+        excluded = set(exclude)
+        related = []
+        for candidate in self._ranked[position]:
+            name = self.symptoms[candidate]
+            if name not in excluded:
+                related.append(name)
+                if len(related) == k:
+                    break
+        return related
@@ -0,0 +1,72 @@
+"""Stand-in for the Hugging Face inference API, for tests and local runs.
+
+    python tests/llm_stub_server.py --port 8089
+    LLM_API_URL=http://127.0.0.1:8089/ HUGGINGFACE_API_TOKEN=stub python app.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubLLMServer:
+    """Echoes ``prompt + reply`` like the real API; ``failures`` queues status codes to
+    return first and ``delay`` slows every answer down"""
+
+    def __init__(self, reply="Stub answer.", delay=0.0, port=0):
+        self.reply = reply
+        self.delay = delay
+        self.failures = []
+        self.requests = []
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                with server._lock:
+                    server.requests.append(payload)
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                    status = server.failures.pop(0) if server.failures else 200
+                try:
+                    time.sleep(server.delay)
+                    body = [{"generated_text": f"{payload.get('inputs', '')} {server.reply}"}] if status == 200 \
+                        else {"error": "stub failure"}
+                    data = json.dumps(body).encode()
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--delay', type=float, default=0.0)
+    args = parser.parse_args()
+    stub = StubLLMServer(delay=args.delay, port=args.port)
+    print(f"Stub LLM listening on {stub.url}")
+    stub.httpd.serve_forever()
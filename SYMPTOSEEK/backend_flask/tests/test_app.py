@@ -0,0 +1,311 @@
+import json
+import logging
+import os
+import re
+
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder
+
+os.environ.setdefault('RESOURCE_WARMUP', 'lazy')
+import app  # noqa: E402
+from history_store import JournalHistoryStore  # noqa: E402
+from model_registry import ModelRegistry  # noqa: E402
+from resources import ResourceRegistry  # noqa: E402
+from session_store import MemorySessionStore  # noqa: E402
+from structured_logging import JsonFormatter  # noqa: E402
+
+LOCATION = {'latitude': 23.78, 'longitude': 90.4}
+CONVERSATION = [
+    {'message': 'hello'},
+    {'message': 'i have itching and skin rash'},
+    {'message': "that's all", **LOCATION},
+]
+
+
+@pytest.fixture
+def client(tmp_path):
+    """Test client whose chat history and sessions live in a temporary directory"""
+    history_store = JournalHistoryStore(str(tmp_path / 'chat_history.json'))
+    app.resources.get('history_store').set(history_store)
+    app.resources.get('session_store').set(MemorySessionStore())
+    yield app.app.test_client()
+    history_store.close()
+
+
+def sse_events(body):
+    events = []
+    for block in body.strip().split('\n\n'):
+        event, data = block.split('\n')
+        events.append((event.removeprefix('event: '), json.loads(data.removeprefix('data: '))))
+    return events
+
+
+def ndjson_events(body):
+    return [(line['event'], line['data']) for line in map(json.loads, body.splitlines())]
+
+
+def stream(client, chat_id, body, ndjson=False):
+    response = client.post('/api/chat/stream' + ('?format=ndjson' if ndjson else ''), json={**body, 'chat_id': chat_id})
+    assert response.status_code == 200
+    text = response.get_data(as_text=True)
+    return response, ndjson_events(text) if ndjson else sse_events(text)
+
+
+def test_stream_sends_server_sent_events(client):
+    response, events = stream(client, 'c1', {'message': 'hello'})
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert [event for event, _ in events] == ['start', 'part', 'done']
+    assert events[0][1] == events[-1][1] == {'chat_id': 'c1'}
+    assert events[1][1]['type'] == 'text'
+
+
+def test_stream_sends_ndjson_on_request(client):
+    response, events = stream(client, 'c1', {'message': 'hello'}, ndjson=True)
+    assert response.mimetype == 'application/x-ndjson'
+    assert [event for event, _ in events] == ['start', 'part', 'done']
+
+    response = client.post('/api/chat/stream', json={'message': 'hello', 'chat_id': 'c2'},
+                           headers={'Accept': 'application/x-ndjson'})
+    assert response.mimetype == 'application/x-ndjson'
+    assert ndjson_events(response.get_data(as_text=True))[0] == ('start', {'chat_id': 'c2'})
+
+
+def test_stream_sends_every_analysis_part_between_start_and_done(client):
+    for body in CONVERSATION[:-1]:
+        stream(client, 'c1', body)
+    _, events = stream(client, 'c1', CONVERSATION[-1])
+    names = [event for event, _ in events]
+    assert names[0] == 'start' and names[-1] == 'done'
+    assert set(names[1:-1]) == {'part'} and len(names) > 4
+    assert [data['type'] for event, data in events if event == 'part'][-2:] == ['doctors', 'map']
+
+
+def test_stream_reports_a_failing_part_in_band(client, monkeypatch):
+    def failing_parts(symptoms, lat, lon):
+        yield {'type': 'text', 'content': 'first part'}
+        raise RuntimeError('prediction failed')
+
+    monkeypatch.setattr(app, 'iter_prediction_parts', failing_parts)
+    for body in CONVERSATION[:-1]:
+        stream(client, 'c1', body)
+    _, events = stream(client, 'c1', CONVERSATION[-1])
+    assert [event for event, _ in events] == ['start', 'part', 'part', 'error']
+    assert events[2][1]['content'] == 'first part'
+    assert 'error' in events[-1][1]
+
+
+def test_chat_and_stream_return_the_same_parts(client):
+    """/api/chat and /api/chat/stream share chat_turn, so a conversation reads the same on both"""
+    for body in CONVERSATION:
+        response = client.post('/api/chat', json={**body, 'chat_id': 'plain'})
+        assert response.status_code == 200 and response.json['chat_id'] == 'plain'
+        _, events = stream(client, 'streamed', body)
+        assert response.json['bot_response_parts'] == [data for event, data in events if event == 'part']
+
+    def history(chat_id):
+        return [(m['isUser'], m['type'], m['text']) for m in client.get(f'/api/chat/history/{chat_id}').json['messages']]
+    assert history('plain') == history('streamed')
+
+
+def predict_batch(client, body):
+    response = client.post('/api/predict/batch', json=body)
+    assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_predict_batch_keeps_row_order_across_chunks(client):
+    symptom_sets = [['itching', 'skin_rash'], ['cough', 'high_fever'], ['headache'], [], ['vomiting', 'nausea']]
+    chunked = predict_batch(client, {'symptom_sets': symptom_sets, 'chunk_size': 2})
+    assert [result['index'] for result in chunked] == list(range(5))
+    assert chunked == predict_batch(client, {'symptom_sets': symptom_sets})
+
+
+def test_predict_batch_ranks_top_k_and_reports_unknown_symptoms(client):
+    results = predict_batch(client, {'symptom_sets': [['itching', 'skin_rash', 'not a symptom']], 'top_k': 4})
+    predictions = results[0]['predictions']
+    assert len(predictions) == 4
+    probabilities = [p['probability'] for p in predictions]
+    assert probabilities == sorted(probabilities, reverse=True)
+    assert results[0]['unknown_symptoms'] == ['not a symptom']
+
+
+@pytest.mark.parametrize('body', [
+    [], 'x', {}, {'symptom_sets': 'itching'}, {'symptom_sets': ['itching']}, {'symptom_sets': [[1, 2]]},
+    {'symptom_sets': [['itching']], 'top_k': 0}, {'symptom_sets': [['itching']], 'top_k': '3'},
+    {'symptom_sets': [['itching']], 'chunk_size': -1}, {'symptom_sets': [['itching']], 'chunk_size': True},
+])
+def test_predict_batch_rejects_malformed_requests(client, body):
+    response = client.post('/api/predict/batch', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.json
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    """Empty model registry used by the reload endpoint; the serving bundle is restored afterwards"""
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    monkeypatch.setattr(app, 'ModelRegistry', lambda root: registry)
+    monkeypatch.setenv('MODEL_ADMIN_TOKEN', 'secret')
+    serving = app.resources['model_bundle']
+    yield registry
+    app.resources.get('model_bundle').set(serving)
+
+
+def publish_small_model(registry, version, features=None):
+    df = app.resources['training_df']
+    X = df.drop('prognosis', axis=1)[features] if features else df.drop('prognosis', axis=1)
+    le = LabelEncoder().fit(df['prognosis'])
+    model = RandomForestClassifier(n_estimators=3, random_state=0).fit(X, le.transform(df['prognosis']))
+    return registry.publish(model, le, {'source': 'test_app'}, version=version, activate=False)
+
+
+def reload(client, body=None, token='secret'):
+    return client.post('/api/model/reload', json=body or {}, headers={'X-Admin-Token': token} if token else {})
+
+
+def test_model_reload_needs_the_admin_token(client, registry, monkeypatch):
+    assert reload(client, token=None).status_code == 401
+    assert reload(client, token='wrong').status_code == 401
+    monkeypatch.delenv('MODEL_ADMIN_TOKEN')
+    response = reload(client)
+    assert response.status_code == 403 and 'MODEL_ADMIN_TOKEN' in response.json['error']
+
+
+def test_model_reload_refuses_unknown_and_mismatched_models(client, registry):
+    serving = app.resources['model_bundle'].version
+    assert reload(client).status_code == 400  # nothing published yet
+    assert reload(client, {'version': 'v9'}).status_code == 400
+    publish_small_model(registry, 'narrow', features=['itching', 'skin_rash'])
+    response = reload(client, {'version': 'narrow'})
+    assert response.status_code == 400 and 'missing' in response.json['error']
+    assert client.get('/api/model').json['version'] == serving
+    assert registry.current_version() is None
+
+
+def test_model_reload_swaps_without_disturbing_running_requests(client, registry, monkeypatch):
+    old = app.resources['model_bundle']
+    knowledge, looked_up = old.knowledge, []
+
+    class RecordingKnowledge:
+        def get(self, disease):
+            looked_up.append(disease)
+            return knowledge.get(disease)
+    monkeypatch.setattr(old, 'knowledge', RecordingKnowledge())
+
+    # A request that has already read the bundle, paused after its first part
+    running = app.iter_prediction_parts(['itching', 'skin_rash', 'nodal_skin_eruptions'], None, None)
+    first_part = next(running)
+
+    publish_small_model(registry, 'v2')
+    response = reload(client, {'version': 'v2'})
+    assert response.status_code == 200
+    assert response.json['previous_version'] == old.version and response.json['model']['version'] == 'v2'
+    assert client.get('/api/model').json['version'] == 'v2'
+    assert registry.current_version() == 'v2'
+
+    rest = list(running)
+    assert first_part['type'] == 'text' and rest
+    assert len(looked_up) == 1  # the knowledge lookup went to the bundle the request started with
+    assert app.resources['model_bundle'].knowledge is not knowledge
+
+
+def scraped(client, sample):
+    """Value of one sample line in the /metrics exposition, 0 if absent"""
+    match = re.search('^' + re.escape(sample) + r' (\S+)$', client.get('/metrics').get_data(as_text=True), re.M)
+    return float(match.group(1)) if match else 0
+
+
+def test_metrics_reflect_served_requests(client):
+    chat_count = 'http_request_duration_seconds_count{method="POST",route="/api/chat",status="200"}'
+    greetings = 'chat_intents_total{intent="greeting"}'
+    saves = 'chat_pipeline_stage_seconds_count{stage="save_chat_history"}'
+    before = {sample: scraped(client, sample) for sample in (chat_count, greetings, saves)}
+
+    assert client.post('/api/chat', json={'message': 'hello', 'chat_id': 'c1'}).status_code == 200
+    assert scraped(client, chat_count) == before[chat_count] + 1
+    assert scraped(client, greetings) == before[greetings] + 1
+    assert scraped(client, saves) == before[saves] + 2  # the user message and the reply
+    assert app.REQUEST_SECONDS.count('POST', '/api/chat', 200) == before[chat_count] + 1
+
+    response = client.get('/metrics')
+    assert response.content_type == app.MetricsRegistry.CONTENT_TYPE
+    assert '# TYPE http_request_duration_seconds histogram' in response.get_data(as_text=True)
+
+
+def test_request_ids_are_reused_or_generated(client):
+    assert client.get('/api/chat/history', headers={'X-Request-ID': 'upstream-1'}).headers['X-Request-ID'] == 'upstream-1'
+    generated = client.get('/api/chat/history').headers['X-Request-ID']
+    assert re.fullmatch('[0-9a-f]{32}', generated)
+    assert client.get('/api/chat/history').headers['X-Request-ID'] != generated
+    assert client.get('/api/chat/history', headers={'X-Request-ID': 'x' * 500}).headers['X-Request-ID'] != 'x' * 500
+
+
+class JsonLines(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.setFormatter(JsonFormatter())
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(json.loads(self.format(record)))
+
+
+def test_each_request_logs_one_json_line(client):
+    handler = JsonLines()
+    logger = logging.getLogger('symptoseek')
+    logger.addHandler(handler)
+    try:
+        client.get('/api/chat/history?user_id=u1', headers={'X-Request-ID': 'req-42'})
+    finally:
+        logger.removeHandler(handler)
+
+    access = [line for line in handler.lines if line.get('route')]
+    assert len(access) == 1
+    line = access[0]
+    assert line['message'] == 'GET /api/chat/history 200'
+    assert line['request_id'] == 'req-42'
+    assert (line['method'], line['route'], line['status']) == ('GET', '/api/chat/history', 200)
+    assert line['duration_ms'] >= 0
+
+
+def test_readiness_waits_for_every_resource(client, monkeypatch):
+    registry = ResourceRegistry()
+    registry.register('model_bundle', lambda: 'model')
+    registry.register('doctor_index', lambda: 'index')
+    monkeypatch.setattr(app, 'resources', registry)
+
+    response = client.get('/api/ready')
+    assert response.status_code == 503
+    assert response.json['ready'] is False
+    assert response.json['resources']['model_bundle']['loaded'] is False
+
+    registry.warm_up()
+    response = client.get('/api/ready')
+    assert response.status_code == 200
+    assert response.json['ready'] is True
+    assert all(status['loaded'] for status in response.json['resources'].values())
+
+
+def test_session_stats_count_expired_and_evicted_sessions(client):
+    now = [1000.0]
+    app.resources.get('session_store').set(MemorySessionStore(ttl=60, max_entries=2, clock=lambda: now[0]))
+
+    def report_symptom(chat_id, at):
+        now[0] = at
+        assert client.post('/api/chat', json={'message': 'i have itching', 'chat_id': chat_id}).status_code == 200
+
+    report_symptom('c1', 1000)
+    report_symptom('c2', 1010)
+    stats = client.get('/api/sessions/stats').json
+    assert stats == {'backend': 'memory', 'active_sessions': 2, 'max_entries': 2, 'ttl_seconds': 60,
+                     'expired': 0, 'evicted': 0}
+
+    report_symptom('c3', 1020)  # c1 is the least recently used
+    stats = client.get('/api/sessions/stats').json
+    assert (stats['active_sessions'], stats['expired'], stats['evicted']) == (2, 0, 1)
+
+    now[0] = 1100  # c2 and c3 have been idle for longer than the TTL
+    stats = client.get('/api/sessions/stats').json
+    assert (stats['active_sessions'], stats['expired'], stats['evicted']) == (0, 2, 1)
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from compress_model import compress_forest, distill_forest, truncate_tree
+from forest_engine import ForestEngine, export_forest
+
+
+def make_model():
+    rng = np.random.default_rng(0)
+    X = rng.integers(0, 2, size=(300, 10)).astype(float)
+    y = (X[:, 0] + 2 * X[:, 3] + X[:, 7] * X[:, 2]).astype(int)
+    return RandomForestClassifier(n_estimators=12, random_state=0).fit(X, y), X
+
+
+def test_truncated_tree_is_compact_and_predicts_cut_distribution():
+    model, X = make_model()
+    tree = model.estimators_[0]
+    cut = truncate_tree(tree, 2)
+
+    assert cut.tree_.max_depth == 2
+    assert cut.tree_.node_count <= 7 < tree.tree_.node_count
+    # Every row lands in the depth-2 ancestor of its original leaf
+    path = tree.decision_path(X).toarray()
+    depth = np.cumsum(path, axis=1)
+    for row in range(20):
+        ancestor = np.flatnonzero(path[row] & (depth[row] == 3))
+        ancestor = ancestor[0] if len(ancestor) else tree.apply(X[row:row + 1])[0]
+        value = tree.tree_.value[ancestor, 0]
+        np.testing.assert_allclose(cut.predict_proba(X[row:row + 1])[0], value / value.sum())
+
+
+def test_compress_forest_keeps_prefix_and_exports(tmp_path):
+    model, X = make_model()
+    np.testing.assert_array_equal(compress_forest(model).predict_proba(X), model.predict_proba(X))
+
+    small = compress_forest(model, n_trees=5, max_depth=3)
+    assert len(small.estimators_) == 5 and len(model.estimators_) == 12
+    assert max(e.tree_.max_depth for e in small.estimators_) <= 3
+
+    export_forest(small, tmp_path)
+    np.testing.assert_allclose(ForestEngine.load(tmp_path).predict_proba(X), small.predict_proba(X), atol=1e-12)
+
+
+def test_distilled_forest_keeps_classes_the_teacher_never_predicts():
+    """A rare class outvoted everywhere is seeded from its training rows so predict_proba columns still line up"""
+    X = pd.DataFrame([[1, 0]] * 50 + [[1, 1]] * 50 + [[1, 1]] * 3, columns=['bias', 'signal'])
+    y = np.array([0] * 50 + [1] * 50 + [2] * 3)
+    teacher = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    assert 2 not in teacher.predict(X)
+
+    with pytest.raises(ValueError, match=r'missing classes \[2\]'):
+        distill_forest(teacher, X, n_estimators=5)
+    student = distill_forest(teacher, X, n_estimators=5, y=y)
+    np.testing.assert_array_equal(student.classes_, teacher.classes_)
+    assert student.predict_proba(X).shape == (len(X), 3)
@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+from disease_knowledge import DiseaseKnowledge, MissingDiseaseError, fallback_info
+
+
+def make_frames():
+    descriptions = pd.DataFrame({
+        'Disease': ['Acne ', 'Migraine', 'Flu'],
+        'Symptom_Description': ['Acne is the formation of comedones and papules on the skin.', 'short', None],
+    })
+    precautions = pd.DataFrame({
+        'Disease': ['Acne', 'Migraine'],
+        'Symptom_precaution_0': ['bath twice', 'rest'],
+        'Symptom_precaution_1': ['avoid fatty food', None],
+        'Symptom_precaution_2': [None, None],
+    })
+    return descriptions, precautions
+
+
+def build(classes=('acne', 'migraine', 'bursitis')):
+    descriptions, precautions = make_frames()
+    return DiseaseKnowledge.build(descriptions, precautions, {'Acne': 'Dermatologist', 'Migraine ': 'Neurologist'}, classes)
+
+
+def test_dataset_text_is_used_and_rendered_once():
+    """Lookups ignore case and padding; usable CSV rows are rendered into the fragments"""
+    entry = build().get('  ACNE ')
+    assert entry.name == 'acne'
+    assert entry.description.startswith('Acne is the formation')
+    assert entry.precautions == ['bath twice', 'avoid fatty food']
+    assert entry.specialty == 'Dermatologist'
+    assert not entry.fallback
+    assert entry.description_text.endswith(entry.description)
+    assert entry.precautions_text.splitlines()[1:] == ['• bath twice', '• avoid fatty food']
+    assert 'Dermatologist' in entry.doctor_intro and 'Dermatologist' in entry.location_help
+
+
+def test_short_or_missing_text_falls_back():
+    """Too-short descriptions and fewer than two precautions use the generic text"""
+    knowledge = build()
+    migraine = knowledge.get('migraine')
+    assert migraine.fallback
+    assert migraine.description == fallback_info('migraine')['description']
+    assert migraine.precautions == fallback_info('migraine')['precautions']
+    assert migraine.specialty == 'Neurologist'
+
+    bursitis = knowledge.get('bursitis')
+    assert bursitis.specialty == 'General Medicine'
+    assert bursitis.description.startswith('bursitis is a medical condition')
+    assert knowledge.fallback_count() == 3  # migraine, bursitis and the CSV-only flu
+
+
+def test_validate_reports_missing_classes():
+    knowledge = build(classes=['acne'])
+    knowledge.validate(['Acne', 'migraine'])
+    with pytest.raises(MissingDiseaseError, match='bursitis'):
+        knowledge.validate(['acne', 'bursitis'])
+    # A class added after the table was built still gets a usable entry
+    assert knowledge.get('bursitis').fallback
+    assert 'bursitis' not in knowledge
+
+
+def test_validate_reports_classes_missing_from_the_csvs():
+    """Entries built from generic fallback text do not count as covered"""
+    knowledge = build(classes=['acne', 'migraine', 'bursitis'])
+    assert knowledge.uncovered(['acne', 'bursitis']) == ['bursitis']
+    assert knowledge.validate(['acne', 'migraine', 'bursitis']) == ['migraine', 'bursitis']
+    assert knowledge.validate(['acne'], strict=True) == []
+    with pytest.raises(MissingDiseaseError, match='bursitis'):
+        knowledge.validate(['acne', 'bursitis'], strict=True)
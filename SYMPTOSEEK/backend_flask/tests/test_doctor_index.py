@@ -0,0 +1,66 @@
+import os
+import numpy as np
+import pandas as pd
+from doctor_index import DoctorIndex, haversine_km
+
+
+def make_doctors(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'name': [f'Dr. {i}' for i in range(n)],
+        'speciality': ['Cardiologist'] * n,
+        'latitude': rng.uniform(20.5, 26.5, n),
+        'longitude': rng.uniform(88.0, 92.5, n),
+    })
+
+
+def test_unusable_rows_are_dropped_once():
+    """Rows with missing, non-numeric or zero coordinates never reach a query"""
+    df = pd.DataFrame({
+        'name': ['a', 'b', 'c', 'd'],
+        'speciality': ['Cardiologist', 'Cardiologist', None, 'Cardiologist'],
+        'latitude': [23.7, 0, 23.8, 'n/a'],
+        'longitude': [90.4, 0, 90.5, 90.4],
+    })
+    index = DoctorIndex(df)
+    assert [doc['name'] for doc in index.records] == ['a']
+    assert index.nearest([0], 'not-a-number', 90.4) == []
+
+
+def test_tree_and_brute_force_agree():
+    """The BallTree path returns the same doctors as a full vectorized scan"""
+    index = DoctorIndex(make_doctors(), tree_threshold=100)
+    row_ids = np.arange(len(index))
+    lat, lon = 23.7, 90.4
+
+    via_tree = index.nearest(row_ids, lat, lon, k=5, key='Cardiologist')
+    via_scan = index.nearest(row_ids, lat, lon, k=5)
+    assert [d['name'] for d in via_tree] == [d['name'] for d in via_scan]
+    np.testing.assert_allclose([d['distance'] for d in via_tree], [d['distance'] for d in via_scan])
+
+    expected = haversine_km(np.radians(lat), np.radians(lon), index.coords)
+    assert via_scan[0]['distance'] == expected.min()
+    assert via_scan[0]['map_url'].startswith('http://www.openstreetmap.org/?mlat=')
+
+
+def test_specialty_rows_and_reload(tmp_path):
+    """Specialty labels resolve to row ids at build time and edits mark the index stale"""
+    path = tmp_path / 'doctors.csv'
+    pd.DataFrame({
+        'name': ['a', 'b', 'c'],
+        'speciality': ['Cardiologist', 'Skin & VD Specialist', 'Medicine Specialist'],
+        'latitude': [23.7, 23.8, 23.9],
+        'longitude': [90.4, 90.5, 90.6],
+    }).to_csv(path, index=False)
+    keywords = {'Cardiologist': ['Cardio', 'Heart'], 'Dermatologist': ['Dermatologist', 'Skin'], 'Urologist': []}
+
+    index = DoctorIndex.from_csv(str(path), keywords)
+    assert index.rows_for_specialty('Cardiologist').tolist() == [0]
+    assert index.rows_for_specialty('Dermatologist').tolist() == [1]
+    assert index.rows_for_specialty('Urologist').tolist() == []
+    assert index.rows_for_specialty('Unknown').tolist() == []
+    assert [d['name'] for d in index.nearest_for_specialty('Dermatologist', 23.7, 90.4)] == ['b']
+    assert not index.is_stale()
+
+    os.utime(path, (0, 0))
+    assert index.is_stale()
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from forest_engine import ForestEngine, artifact_exists, export_forest
+
+
+def make_model():
+    rng = np.random.default_rng(0)
+    X = rng.integers(0, 2, size=(300, 12)).astype(float)
+    y = (X[:, 0] + 2 * X[:, 3] + X[:, 7]).astype(int)
+    return RandomForestClassifier(n_estimators=15, random_state=0).fit(X, y), X
+
+
+def test_exported_forest_matches_sklearn(tmp_path):
+    """Memory-mapped inference reproduces predict_proba"""
+    model, X = make_model()
+    assert not artifact_exists(tmp_path)
+    export_forest(model, tmp_path)
+    assert artifact_exists(tmp_path)
+
+    engine = ForestEngine.load(tmp_path)
+    assert isinstance(engine.left.base, np.memmap)
+    np.testing.assert_allclose(engine.predict_proba(X), model.predict_proba(X), atol=1e-12)
+    np.testing.assert_array_equal(engine.predict(X), model.predict(X))
+    np.testing.assert_array_equal(engine.classes_, model.classes_)
+
+
+def test_rejects_wrong_width(tmp_path):
+    model, X = make_model()
+    export_forest(model, tmp_path)
+    with pytest.raises(ValueError):
+        ForestEngine.load(tmp_path, mmap=False).predict_proba(X[:, :5])
+
+
+def test_binary_forest_uses_masks_and_indices(tmp_path):
+    """0/1 features compile to bitmasks; the compact index API agrees with dense rows"""
+    model, X = make_model()
+    export_forest(model, tmp_path)
+    engine = ForestEngine.load(tmp_path)
+    assert engine.binary
+
+    for row in X[:20]:
+        np.testing.assert_allclose(engine.predict_proba_indices(np.flatnonzero(row)), model.predict_proba(row[None])[0], atol=1e-12)
+    np.testing.assert_allclose(engine.predict_proba_one(np.zeros(12)), model.predict_proba(np.zeros((1, 12)))[0], atol=1e-12)
+
+
+def test_continuous_features_fall_back_to_traversal(tmp_path):
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(200, 6))
+    y = (X[:, 0] > X[:, 1]).astype(int) + (X[:, 2] > 0.5)
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    export_forest(model, tmp_path)
+
+    engine = ForestEngine.load(tmp_path)
+    assert not engine.binary
+    np.testing.assert_allclose(engine.predict_proba(X), model.predict_proba(X), atol=1e-12)
+    np.testing.assert_allclose(engine.predict_proba_indices([0, 3]), model.predict_proba([[1, 0, 0, 1, 0, 0]])[0], atol=1e-12)
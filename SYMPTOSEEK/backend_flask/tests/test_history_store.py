@@ -0,0 +1,218 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from history_store import JournalHistoryStore, SQLiteHistoryStore
+
+
+def make_message(text, is_user=True):
+    return {'text': text, 'isUser': is_user, 'timestamp': datetime.now().isoformat(), 'type': 'text'}
+
+
+def chat_ids(store, user_id='u1', **page):
+    summaries, _ = store.list_chat_summaries(user_id, **page)
+    return [summary['chat_id'] for summary in summaries]
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / 'chat_history.json')
+
+
+def test_messages_are_journaled_not_snapshotted(snapshot_path):
+    """Adding a message appends one journal line and leaves the snapshot alone"""
+    store = JournalHistoryStore(snapshot_path, compact_every=100)
+    store.add_message('u1', 'c1', make_message('I have a headache'))
+    store.add_message('u1', 'c1', make_message('Noted', is_user=False))
+
+    with open(store.journal_path) as f:
+        assert len(f.readlines()) == 2
+    chat = store.get_chat('u1', 'c1')
+    assert chat['title'] == 'I have a headache'
+    assert len(chat['messages']) == 2
+
+
+def test_recovery_replays_journal(snapshot_path):
+    """A store reopened without a clean shutdown sees every journaled message"""
+    store = JournalHistoryStore(snapshot_path, compact_every=100)
+    store.add_message('u1', 'c1', make_message('fever'))
+    store.add_message('u1', 'c2', make_message('cough'))
+    store.delete_chat('u1', 'c2')
+
+    recovered = JournalHistoryStore(snapshot_path, compact_every=100)
+    assert chat_ids(recovered) == ['c1']
+    assert recovered.get_chat('u1', 'c1')['messages'][0]['text'] == 'fever'
+
+
+def test_compaction_and_torn_tail(snapshot_path):
+    """Compaction truncates the journal and a torn trailing record is dropped"""
+    store = JournalHistoryStore(snapshot_path, compact_every=2)
+    store.add_message('u1', 'c1', make_message('one'))
+    store.add_message('u1', 'c1', make_message('two'))
+    assert open(store.journal_path).read() == ''
+
+    store.add_message('u1', 'c1', make_message('three'))
+    with open(store.journal_path, 'a') as f:
+        f.write('{"seq": 4, "op": "add", "us')
+
+    recovered = JournalHistoryStore(snapshot_path, compact_every=100)
+    texts = [m['text'] for m in recovered.get_chat('u1', 'c1')['messages']]
+    assert texts == ['one', 'two', 'three']
+
+
+def test_replay_skips_records_already_in_snapshot(snapshot_path):
+    """Records covered by the snapshot sequence number are not applied twice"""
+    store = JournalHistoryStore(snapshot_path, compact_every=100)
+    store.add_message('u1', 'c1', make_message('one'))
+    journal = open(store.journal_path).read()
+    store.compact()
+    # Simulate a crash between replacing the snapshot and truncating the journal
+    with open(store.journal_path, 'w') as f:
+        f.write(journal)
+
+    recovered = JournalHistoryStore(snapshot_path, compact_every=100)
+    assert len(recovered.get_chat('u1', 'c1')['messages']) == 1
+
+
+def test_loads_legacy_snapshot_and_cleans_up(snapshot_path):
+    """The pre-journal chat_history.json layout still loads"""
+    old = (datetime.now() - timedelta(days=5)).isoformat()
+    new = datetime.now().isoformat()
+    with open(snapshot_path, 'w') as f:
+        json.dump({'u1': {
+            'old': {'messages': [], 'created_at': old, 'title': 'Old', 'last_updated': old},
+            'new': {'messages': [], 'created_at': new, 'title': 'New', 'last_updated': new},
+        }}, f)
+
+    store = JournalHistoryStore(snapshot_path)
+    assert store.cleanup_old_chats(datetime.now() - timedelta(days=3)) == 1
+    assert chat_ids(store) == ['new']
+
+
+def test_sqlite_store_round_trip(tmp_path):
+    """The SQLite backend keeps chats ordered by last update and cascades deletes"""
+    db_path = str(tmp_path / 'chat_history.db')
+    store = SQLiteHistoryStore(db_path)
+    store.add_message('u1', 'c1', make_message('I have a rash'))
+    store.add_message('u1', 'c2', make_message('hello'))
+    store.add_message('u1', 'c1', make_message('Noted', is_user=False))
+
+    # A second handle sees the same data, like another gunicorn worker would
+    other = SQLiteHistoryStore(db_path)
+    assert chat_ids(other) == ['c1', 'c2']
+    chat = other.get_chat('u1', 'c1')
+    assert chat['title'] == 'I have a rash'
+    assert [m['text'] for m in chat['messages']] == ['I have a rash', 'Noted']
+
+    assert store.delete_chat('u1', 'c1')
+    assert not store.delete_chat('u1', 'c1')
+    assert other.get_chat('u1', 'c1') is None
+    assert store.cleanup_old_chats(datetime.now() + timedelta(seconds=1)) == 1
+    assert chat_ids(other) == []
+
+
+@pytest.fixture(params=['journal', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'journal':
+        return JournalHistoryStore(str(tmp_path / 'chat_history.json'))
+    return SQLiteHistoryStore(str(tmp_path / 'chat_history.db'))
+
+
+def test_summaries_are_maintained_on_write(store):
+    """The listing preview is the last bot text message, falling back to the last message"""
+    store.add_message('u1', 'c1', make_message('x' * 150))
+    summary = store.get_chat_summary('u1', 'c1')
+    assert summary['last_message'] == 'x' * 100 + '...'
+
+    store.add_message('u1', 'c1', make_message('Got it', is_user=False))
+    store.add_message('u1', 'c1', {'text': [{'name': 'Dr. A'}], 'isUser': False, 'type': 'doctors'})
+    store.add_message('u1', 'c1', make_message('thanks'))
+    summary = store.get_chat_summary('u1', 'c1')
+    assert summary['last_message'] == 'Got it'
+    assert summary['message_count'] == 4
+    assert summary['title'] == 'x' * 37 + '...'
+
+
+def test_chat_list_pagination(store):
+    """Walking ``next_before`` visits every chat once, newest first"""
+    for i in range(5):
+        store.add_message('u1', f'c{i}', make_message(f'message {i}'))
+
+    seen = []
+    before = None
+    while True:
+        summaries, before = store.list_chat_summaries('u1', limit=2, before=before)
+        seen.extend(summary['chat_id'] for summary in summaries)
+        if before is None:
+            break
+    assert seen == ['c4', 'c3', 'c2', 'c1', 'c0']
+
+
+def test_message_pagination(store):
+    """Message pages come back oldest first and end with a None cursor"""
+    for i in range(5):
+        store.add_message('u1', 'c1', make_message(f'm{i}'))
+
+    page, before = store.get_messages('u1', 'c1', limit=3)
+    assert [m['text'] for m in page] == ['m2', 'm3', 'm4']
+    page, before = store.get_messages('u1', 'c1', limit=3, before=before)
+    assert [m['text'] for m in page] == ['m0', 'm1']
+    assert before is None
+
+
+def test_messages_of_a_missing_chat_are_an_empty_page(store):
+    """A chat deleted between the summary lookup and the message read is not an error"""
+    store.add_message('u1', 'c1', make_message('m0'))
+    store.delete_chat('u1', 'c1')
+    assert store.get_messages('u1', 'c1', limit=3) == ([], None)
+    assert store.get_messages('nobody', 'c1') == ([], None)
+
+
+def test_negative_message_cursor_is_rejected(store):
+    """A negative ``before`` would slice from the end of the chat instead of paging"""
+    for i in range(5):
+        store.add_message('u1', 'c1', make_message(f'm{i}'))
+
+    with pytest.raises(ValueError):
+        store.get_messages('u1', 'c1', limit=3, before=-1)
+    assert store.get_messages('u1', 'c1', before=0) == ([], None)
+
+
+def test_negative_limits_are_rejected(store):
+    """SQLite reads a negative LIMIT as no limit at all, so neither backend accepts one"""
+    store.add_message('u1', 'c1', make_message('m0'))
+
+    with pytest.raises(ValueError):
+        store.list_chat_summaries('u1', limit=-5)
+    with pytest.raises(ValueError):
+        store.get_messages('u1', 'c1', limit=-5)
+    with pytest.raises(ValueError):
+        store.expire_chats(datetime.now() + timedelta(days=1), limit=-5)
+    assert chat_ids(store) == ['c1']
+
+
+def test_sqlite_close_reaches_every_thread(tmp_path):
+    """Connections opened by worker threads are closed along with the caller's"""
+    store = SQLiteHistoryStore(str(tmp_path / 'chat_history.db'))
+    connections = [store._connection()]
+    done, release = threading.Barrier(3), threading.Event()
+
+    def worker():
+        connections.append(store._connection())
+        done.wait()
+        release.wait()
+
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    done.wait()
+    store.close()
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute('SELECT 1')
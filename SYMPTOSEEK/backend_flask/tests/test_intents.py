@@ -0,0 +1,55 @@
+import re
+
+import pytest
+
+from intents import INTENTS, RESPONSES, IntentRouter, keyword_pattern
+
+
+@pytest.fixture(scope='module')
+def router():
+    return IntentRouter()
+
+
+@pytest.mark.parametrize('message, intent', [
+    ('Hi', 'greeting'),
+    ('hello!', 'greeting'),
+    ('how does this work?', 'help'),
+    ('That was really helpful', 'thanks'),
+    ('Thank   you', 'thanks'),
+    ('start over', 'reset'),
+    ('this is urgent', 'emergency'),
+    ("I can't breathe", 'emergency'),
+    ("that's all", 'completion'),
+    ('no more symptoms', 'completion'),
+    ('nope', 'negative'),
+    ('I have a headache and feel nauseous', None),
+])
+def test_classify(router, message, intent):
+    assert router.classify(message) == intent
+
+
+def test_keywords_match_whole_words_only(router):
+    """Substrings of longer words ("hi" in "this", "complete" in "completely") do not count"""
+    assert router.classify('this rash on my hip') is None
+    assert router.classify('i feel completely drained') is None
+    assert router.classify('clear discharge') is None  # 'clear' is a whole-message intent
+
+
+def test_priority_and_length_limit(router):
+    assert router.classify('hi, I have chest pain') == 'emergency'
+    assert router.classify('thanks, that is all') == 'thanks'
+    # Greetings only count in short messages; the longer one falls through to help
+    assert router.classify('hello there, I need help with a rash') == 'help'
+
+
+def test_keyword_pattern_matches_exactly_the_keywords():
+    keywords = ['help', 'helpful', 'hi', 'thank you', 'thanks']
+    pattern = re.compile(keyword_pattern(keywords))
+    for keyword in keywords:
+        assert pattern.fullmatch(keyword)
+    for other in ['he', 'help ful', 'thank', 'thanks you', 'h']:
+        assert not pattern.fullmatch(other)
+
+
+def test_every_canned_reply_has_an_intent():
+    assert set(RESPONSES) <= {intent['name'] for intent in INTENTS}
@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+
+from llm_client import FALLBACK_RESPONSE, CircuitBreaker, LLMClient, TTLCache
+from llm_stub_server import StubLLMServer
+
+
+@pytest.fixture
+def stub():
+    server = StubLLMServer().start()
+    yield server
+    server.stop()
+
+
+def make_client(stub, **kwargs):
+    kwargs.setdefault('backoff', 0.01)
+    return LLMClient(api_url=stub.url, token='test-token', timeout=2, **kwargs)
+
+
+def test_answers_are_cached_by_normalized_prompt(stub):
+    client = make_client(stub)
+    assert client.query("Patient says: headache") == "Stub answer."
+    assert client.query("  patient SAYS:   headache ") == "Stub answer."
+    assert len(stub.requests) == 1
+    assert stub.requests[0]['parameters']['max_new_tokens'] == 150
+
+
+def test_transient_errors_are_retried(stub):
+    stub.failures = [503, 502]
+    client = make_client(stub, max_retries=2)
+    assert client.query("fever") == "Stub answer."
+    assert len(stub.requests) == 3
+
+
+def test_circuit_opens_after_repeated_failures(stub):
+    stub.failures = [500] * 10
+    client = make_client(stub, max_retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    assert client.query("a") == FALLBACK_RESPONSE
+    assert client.query("b") == FALLBACK_RESPONSE
+    assert client.breaker.state == "open"
+    assert client.query("c") == FALLBACK_RESPONSE
+    assert len(stub.requests) == 2
+
+
+def test_concurrency_is_bounded(stub):
+    stub.delay = 0.2
+    client = make_client(stub, max_concurrency=2, acquire_timeout=5)
+    threads = [threading.Thread(target=client.query, args=(f"symptom {i}",)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert stub.max_in_flight <= 2
+    assert len(stub.requests) == 6
+
+
+def test_query_async_returns_future(stub):
+    client = make_client(stub)
+    assert client.query_async("cough").result(timeout=5) == "Stub answer."
+
+
+def test_half_open_trial_closes_circuit():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert not breaker.allow()
+    now[0] = 11
+    assert breaker.allow() and not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_half_open_trial_survives_a_slot_timeout(stub):
+    """A query that cannot get a slot must not use up the half-open trial"""
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    client = make_client(stub, max_concurrency=1, acquire_timeout=0.05, breaker=breaker)
+    breaker.record_failure()
+    now[0] = 11
+
+    client._slots.acquire()  # every slot is busy
+    assert client.query("cough") == FALLBACK_RESPONSE
+    client._slots.release()
+
+    assert breaker.state == "half-open"
+    assert client.query("cough") == "Stub answer."
+    assert breaker.state == "closed"
+
+
+def test_ttl_cache_expires_and_evicts():
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=5, clock=lambda: now[0])
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert cache.get('b') is None and cache.get('a') == 1
+    now[0] = 6
+    assert cache.get('a') is None
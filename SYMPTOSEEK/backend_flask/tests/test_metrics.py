@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from metrics import MetricsRegistry, timed_iter
+
+
+def sample_lines(registry, name):
+    return [line for line in registry.render().splitlines() if line.startswith(name)]
+
+
+def test_counter_renders_per_label_series():
+    registry = MetricsRegistry()
+    intents = registry.counter('chat_intents', 'Chat messages by intent', ['intent'])
+    intents.inc('greeting')
+    intents.inc('greeting')
+    intents.inc('none', amount=3)
+    assert intents.value('greeting') == 2
+    assert '# TYPE chat_intents counter' in registry.render()
+    assert sample_lines(registry, 'chat_intents_total') == [
+        'chat_intents_total{intent="greeting"} 2',
+        'chat_intents_total{intent="none"} 3',
+    ]
+    with pytest.raises(ValueError):
+        intents.inc()
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram('latency_seconds', 'Latency', ['route'], buckets=(0.1, 1.0))
+    for value in [0.05, 0.1, 0.5, 3.0]:
+        latency.observe(value, '/api/chat')
+    assert sample_lines(registry, 'latency_seconds') == [
+        'latency_seconds_bucket{route="/api/chat",le="0.1"} 2',
+        'latency_seconds_bucket{route="/api/chat",le="1.0"} 3',
+        'latency_seconds_bucket{route="/api/chat",le="+Inf"} 4',
+        'latency_seconds_sum{route="/api/chat"} 3.65',
+        'latency_seconds_count{route="/api/chat"} 4',
+    ]
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter('odd', 'Odd labels', ['value']).inc('say "hi"\n')
+    assert sample_lines(registry, 'odd_total') == ['odd_total{value="say \\"hi\\"\\n"} 1']
+
+
+def test_timer_decorator_is_safe_across_threads():
+    registry = MetricsRegistry()
+    stage = registry.histogram('stage_seconds', 'Stage time', ['stage'])
+
+    @stage.time('work')
+    def work(event):
+        event.wait(1)
+
+    event = threading.Event()
+    threads = [threading.Thread(target=work, args=(event,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    event.set()
+    for thread in threads:
+        thread.join()
+    assert stage.count('work') == 4
+
+
+def test_timed_iter_excludes_consumer_time():
+    registry = MetricsRegistry()
+    stage = registry.histogram('stage_seconds', 'Stage time', ['stage'])
+    for _ in timed_iter(range(3), stage, 'analysis'):
+        time.sleep(0.05)  # the consumer is slow, the generator is not
+    assert stage.count('analysis') == 1
+    assert stage._series[('analysis',)][1] < 0.05
+
+
+def test_callback_metric_reads_at_scrape_time():
+    registry = MetricsRegistry()
+    state = {'active': None}
+    registry.callback('sessions_active', 'Active sessions', lambda: state['active'] and {(): state['active']})
+    assert sample_lines(registry, 'sessions_active') == []
+    state['active'] = 7
+    assert sample_lines(registry, 'sessions_active') == ['sessions_active 7']
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder
+
+from forest_engine import ForestEngine
+from model_registry import FeatureMismatchError, ModelRegistry
+
+FEATURES = ['cough', 'fever', 'headache', 'rash']
+
+
+def make_model(seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.integers(0, 2, size=(60, 4)), columns=FEATURES)
+    labels = np.where(X['rash'] == 1, 'allergy', np.where(X['fever'] == 1, 'flu', 'cold'))
+    le = LabelEncoder().fit(labels)
+    return RandomForestClassifier(n_estimators=5, random_state=seed).fit(X, le.transform(labels)), le
+
+
+def test_publish_activate_and_load(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    model, le = make_model()
+    registry.publish(model, le, {'metrics': {'test_accuracy': 0.9}}, version='v1')
+    registry.publish(*make_model(1), version='v2', activate=False)
+
+    assert registry.versions() == ['v1', 'v2']
+    assert registry.current_version() == 'v1'
+    bundle = registry.load()
+    assert bundle.version == 'v1'
+    assert isinstance(bundle.model, ForestEngine)
+    assert bundle.features == FEATURES
+    assert bundle.metadata['classes'] == ['allergy', 'cold', 'flu']
+    assert bundle.summary()['metrics'] == {'test_accuracy': 0.9}
+
+    registry.activate('v2')
+    assert registry.load().version == 'v2'
+    with pytest.raises(KeyError):
+        registry.activate('v3')
+    with pytest.raises(FileExistsError):
+        registry.publish(model, le, version='v1')
+
+
+def test_feature_check(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    registry.publish(*make_model(), version='v1')
+    bundle = registry.load()
+
+    bundle.validate_features(FEATURES)
+    with pytest.raises(FeatureMismatchError, match='missing'):
+        bundle.validate_features(FEATURES + ['vomiting'])
+    with pytest.raises(FeatureMismatchError, match='order'):
+        bundle.validate_features(list(reversed(FEATURES)))
+
+
+def test_no_active_version(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        ModelRegistry(str(tmp_path / 'empty')).load()
+
+
+def test_load_rejects_unpublished_versions(tmp_path):
+    """A version name is never turned into a path unless the registry published it"""
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    registry.publish(*make_model(), version='v1')
+    for version in ['v3', '../v1', '../../etc', '.']:
+        with pytest.raises(KeyError):
+            registry.load(version)
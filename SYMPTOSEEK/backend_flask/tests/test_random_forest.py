@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+from RandomForest import FamilySearch, ResultsCache, data_fingerprint, parse_args, select_best, successive_halving
+
+
+def make_data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.integers(0, 2, size=(120, 8)), columns=[f's{i}' for i in range(8)])
+    y = (X['s0'] + 2 * X['s1']).to_numpy()
+    return X, y
+
+
+def test_search_results_are_cached_by_data_and_params(tmp_path):
+    """A second search over the same data is answered from the cache"""
+    X, y = make_data()
+    candidates = [{'n_estimators': n, 'max_depth': None, 'min_samples_leaf': 1, 'max_features': 'sqrt'} for n in (5, 10)]
+    cache_path = str(tmp_path / 'cache.json')
+
+    first = FamilySearch(X, y, 3, ResultsCache(cache_path), data_fingerprint(X, y), n_jobs=1).evaluate_all(candidates)
+    assert [r['cached'] for r in first] == [False, False]
+    assert {'fit_seconds', 'model_size_bytes', 'predict_ms', 'cv_accuracy'} <= set(first[0])
+
+    again = FamilySearch(X, y, 3, ResultsCache(cache_path), data_fingerprint(X, y), n_jobs=1).evaluate_all(candidates)
+    assert [r['cached'] for r in again] == [True, True]
+    assert [r['cv_accuracy'] for r in again] == [r['cv_accuracy'] for r in first]
+
+    y_changed = y.copy()
+    y_changed[0] = 3 - y_changed[0]
+    assert data_fingerprint(X, y_changed) != data_fingerprint(X, y)
+
+
+def test_warm_start_matches_fresh_fit(tmp_path):
+    """Growing a family from 5 to 10 trees scores like fitting 10 trees directly"""
+    X, y = make_data()
+    params = {'max_depth': None, 'min_samples_leaf': 1, 'max_features': 'sqrt'}
+    grown = FamilySearch(X, y, 3, ResultsCache(None), 'h', n_jobs=1).evaluate_all(
+        [dict(params, n_estimators=5), dict(params, n_estimators=10)])
+    fresh = FamilySearch(X, y, 3, ResultsCache(None), 'h', n_jobs=1).evaluate(dict(params, n_estimators=10))
+    assert grown[1]['cv_accuracy'] == fresh['cv_accuracy']
+
+
+class RecordingSearch(FamilySearch):
+    """Tracks the most fold-model families held at once, per forest size"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.held = {}
+
+    def _grow(self, params, n_estimators):
+        grown = super()._grow(params, n_estimators)
+        self.held[n_estimators] = max(self.held.get(n_estimators, 0), len(self._fold_models))
+        return grown
+
+
+def test_fold_models_are_released_when_families_finish():
+    X, y = make_data()
+    candidates = [{'n_estimators': n, 'max_depth': depth, 'min_samples_leaf': 1, 'max_features': 'sqrt'}
+                  for depth in (None, 3) for n in (5, 10)]
+    search = RecordingSearch(X, y, 3, ResultsCache(None), 'h', n_jobs=1)
+    search.evaluate_all(candidates)
+    assert search.held == {5: 1, 10: 1}
+    assert search._fold_models == {}
+
+
+def test_halving_keeps_only_surviving_families():
+    X, y = make_data()
+    search = RecordingSearch(X, y, 3, ResultsCache(None), 'h', n_jobs=1)
+    args = parse_args(['--n-iter', '9', '--min-estimators', '2', '--max-estimators', '6', '--eta', '3'])
+    results = successive_halving(search, args)
+    assert len(results) == 9 + 3  # 9 families at 2 trees, the best 3 at 6 trees
+    assert search.held == {2: 9, 6: 3}
+    assert search._fold_models == {}
+
+
+def test_select_best_respects_latency_budget():
+    results = [
+        {'cv_accuracy': 0.9, 'predict_ms': 20.0},
+        {'cv_accuracy': 0.85, 'predict_ms': 5.0},
+    ]
+    assert select_best(results)['predict_ms'] == 20.0
+    assert select_best(results, max_predict_ms=10)['predict_ms'] == 5.0
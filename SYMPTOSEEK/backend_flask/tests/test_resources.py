@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+from resources import ResourceRegistry
+
+
+def test_loader_runs_once_across_threads():
+    """Concurrent first use builds the resource a single time"""
+    calls = []
+    registry = ResourceRegistry()
+    registry.register('model', lambda: calls.append(1) or 'loaded')
+
+    threads = [threading.Thread(target=lambda: registry['model']) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert registry['model'] == 'loaded'
+    assert calls == [1]
+    assert registry.ready()
+
+
+def test_failed_load_is_retried_and_reported():
+    """A failing loader leaves the resource unloaded and retries on next use"""
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise IOError('missing file')
+        return 42
+
+    registry = ResourceRegistry()
+    registry.register('data', flaky)
+
+    assert not registry.available('data')
+    assert registry.status()['data']['error'] == 'OSError: missing file'
+    assert not registry.ready()
+    assert registry['data'] == 42
+    assert registry.status()['data']['error'] is None
+
+
+def test_dependent_resources_and_set():
+    """Loaders can read other resources; set() replaces a value in place"""
+    registry = ResourceRegistry()
+
+    @registry.resource('base')
+    def load_base():
+        return 2
+
+    @registry.resource('derived')
+    def load_derived():
+        return registry['base'] * 10
+
+    assert registry['derived'] == 20
+    registry.get('base').set(3)
+    assert registry['base'] == 3
+    with pytest.raises(KeyError):
+        registry['unknown']
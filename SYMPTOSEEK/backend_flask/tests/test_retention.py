@@ -0,0 +1,103 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from history_store import JournalHistoryStore, SQLiteHistoryStore
+from retention import RetentionPolicy, RetentionWorker
+
+NOW = datetime(2024, 6, 10, 12, 0)
+
+
+def message(text):
+    return {'text': text, 'isUser': True, 'timestamp': NOW.isoformat(), 'type': 'text'}
+
+
+@pytest.fixture(params=['journal', 'sqlite'])
+def make_store(request, tmp_path):
+    """Build a store holding chats with the given (created, last_updated) days-ago ages"""
+    def make(ages):
+        chats = {f'c{i}': (NOW - timedelta(days=created), NOW - timedelta(days=updated))
+                 for i, (created, updated) in enumerate(ages)}
+        if request.param == 'journal':
+            path = str(tmp_path / 'chat_history.json')
+            with open(path, 'w') as f:
+                json.dump({'seq': 0, 'chats': {'u1': {
+                    chat_id: {'messages': [message(chat_id)], 'title': chat_id,
+                              'created_at': created.isoformat(), 'last_updated': updated.isoformat()}
+                    for chat_id, (created, updated) in chats.items()
+                }}}, f)
+            return JournalHistoryStore(path)
+
+        store = SQLiteHistoryStore(str(tmp_path / 'chat_history.db'))
+        for chat_id, (created, updated) in chats.items():
+            store.add_message('u1', chat_id, message(chat_id))
+            store._connection().execute('UPDATE chats SET created_at = ?, last_updated = ? WHERE chat_id = ?',
+                                        (created.isoformat(), updated.isoformat(), chat_id))
+        return store
+    return make
+
+
+def remaining(store):
+    summaries, _ = store.list_chat_summaries('u1')
+    return sorted(summary['chat_id'] for summary in summaries)
+
+
+def test_expires_oldest_first_in_batches(make_store):
+    store = make_store([(8, 8), (10, 10), (1, 1), (9, 9)])
+    cutoff = NOW - timedelta(days=3)
+    assert store.expire_chats(cutoff, limit=2) == 2
+    assert remaining(store) == ['c0', 'c2']
+    assert store.expire_chats(cutoff, limit=2) == 1
+    assert store.expire_chats(cutoff, limit=2) == 0
+    assert remaining(store) == ['c2']
+
+
+def test_last_updated_policy_keeps_active_chats(make_store):
+    """A chat started long ago but still in use survives a last_updated policy"""
+    store = make_store([(10, 1), (10, 10)])
+    cutoff = NOW - timedelta(days=3)
+    assert store.expire_chats(cutoff, field='last_updated') == 1
+    assert remaining(store) == ['c0']
+    assert store.expire_chats(cutoff, field='created_at') == 1
+    with pytest.raises(ValueError):
+        store.expire_chats(cutoff, field='title')
+
+
+def test_journal_expiry_does_not_rewrite_snapshot(tmp_path):
+    path = str(tmp_path / 'chat_history.json')
+    store = JournalHistoryStore(path, compact_every=100)
+    store.add_message('u1', 'old', message('old'))
+    store.add_message('u1', 'new', message('new'))
+    store.compact()
+    with open(path) as f:
+        snapshot = f.read()
+
+    assert store.expire_chats(datetime.now() + timedelta(seconds=1), limit=1) == 1
+    with open(path) as f:
+        assert f.read() == snapshot
+    with open(store.journal_path) as f:
+        assert [json.loads(line)['op'] for line in f] == ['delete']
+    # The expiry survives a restart through the journal
+    assert remaining(JournalHistoryStore(path)) == ['new']
+
+
+@pytest.mark.parametrize('settings', [{'batch_size': 0}, {'batch_size': -1}, {'interval': 0}, {'interval': -5}])
+def test_policy_rejects_settings_that_break_the_sweeper(settings, monkeypatch):
+    with pytest.raises(ValueError):
+        RetentionPolicy(**settings)
+    monkeypatch.setenv('CHAT_RETENTION_BATCH_SIZE', '0')
+    with pytest.raises(ValueError):
+        RetentionPolicy.from_env()
+
+
+def test_worker_sweeps_every_batch(make_store):
+    store = make_store([(5, 5), (6, 6), (7, 7), (8, 8), (9, 9), (0, 0)])
+    worker = RetentionWorker(store, RetentionPolicy(batch_size=2, interval=60), clock=lambda: NOW)
+    assert worker.sweep() == 5
+    assert worker.total_expired == 5
+    assert remaining(store) == ['c5']
+
+    worker.start()
+    worker.stop()
+    assert not worker._thread.is_alive()
@@ -0,0 +1,148 @@
+import sqlite3
+import threading
+
+import pytest
+
+from session_store import MemorySessionStore, SQLiteSessionStore, session_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def add_symptom(symptom):
+    def fn(session):
+        session = session or {'confirmed_symptoms': []}
+        session['confirmed_symptoms'] = session['confirmed_symptoms'] + [symptom]
+        return session, len(session['confirmed_symptoms'])
+    return fn
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_store(request, tmp_path):
+    def make(**kwargs):
+        if request.param == 'memory':
+            return MemorySessionStore(**kwargs)
+        return SQLiteSessionStore(str(tmp_path / 'sessions.db'), prune_every=1, **kwargs)
+    return make
+
+
+def test_update_get_delete(make_store):
+    store = make_store()
+    assert store.update('u1', add_symptom('cough')) == 1
+    assert store.update('u1', add_symptom('fever')) == 2
+    assert store.get('u1') == {'confirmed_symptoms': ['cough', 'fever']}
+    assert store.update('u1', lambda session: (None, 'done')) == 'done'
+    assert store.get('u1') is None
+    store.update('u2', add_symptom('rash'))
+    store.delete('u2')
+    assert len(store) == 0
+
+
+def test_concurrent_updates_are_not_lost(make_store):
+    """Every thread's symptom survives when one conversation is updated in parallel"""
+    store = make_store()
+    threads = [threading.Thread(target=lambda i=i: [store.update('u1', add_symptom(f's{i}-{j}')) for j in range(10)])
+               for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(store.get('u1')['confirmed_symptoms']) == 80
+
+
+def test_idle_sessions_expire(make_store):
+    clock = FakeClock()
+    store = make_store(ttl=60, clock=clock)
+    store.update('u1', add_symptom('cough'))
+    clock.now += 30
+    store.update('u2', add_symptom('fever'))
+    clock.now += 45
+    assert store.get('u1') is None
+    assert store.get('u2') == {'confirmed_symptoms': ['fever']}
+    # An expired session starts over instead of being resumed
+    assert store.update('u1', add_symptom('rash')) == 1
+
+
+def test_expired_sessions_are_not_counted(make_store):
+    clock = FakeClock()
+    store = make_store(ttl=60, clock=clock)
+    store.update('u1', add_symptom('cough'))
+    clock.now += 30
+    store.update('u2', add_symptom('fever'))
+    assert len(store) == 2
+    clock.now += 45
+    assert len(store) == 1
+    clock.now += 60
+    assert len(store) == 0
+
+
+def test_conversations_of_one_user_are_separate(make_store):
+    store = make_store()
+    store.update(session_key('default_user', 'chat-1'), add_symptom('cough'))
+    store.update(session_key('default_user', 'chat-2'), add_symptom('fever'))
+    assert store.get(session_key('default_user', 'chat-1')) == {'confirmed_symptoms': ['cough']}
+    assert session_key('a:b', 'c') != session_key('a', 'b:c')
+
+
+def test_least_recently_used_sessions_are_evicted(make_store):
+    clock = FakeClock()
+    store = make_store(max_entries=2, clock=clock)
+    for key in ['a', 'b']:
+        store.update(key, add_symptom('cough'))
+        clock.now += 1
+    store.update('a', add_symptom('fever'))  # 'a' is now more recent than 'b'
+    clock.now += 1
+    store.update('c', add_symptom('rash'))
+    assert store.get('b') is None
+    assert store.get('a') is not None and store.get('c') is not None
+    assert len(store) == 2
+    assert store.stats()['evicted'] == 1
+
+
+def test_memory_stays_flat_under_anonymous_traffic():
+    """One-message conversations that are never finished do not accumulate"""
+    clock = FakeClock()
+    store = MemorySessionStore(ttl=60, max_entries=100, clock=clock)
+    for i in range(1000):
+        store.update(session_key('default_user', f'chat-{i}'), add_symptom('cough'))
+        clock.now += 1
+    stats = store.stats()
+    assert stats['active_sessions'] == 60  # ages 1..60 are still within the TTL
+    assert stats['expired'] == 940 and stats['evicted'] == 0
+
+
+def test_memory_store_releases_key_locks():
+    store = MemorySessionStore()
+    store.update('u1', add_symptom('cough'))
+    store.delete('u1')
+    assert store._key_locks == {}
+
+
+def test_sqlite_close_reaches_every_thread(tmp_path):
+    """Connections opened by worker threads are closed along with the caller's"""
+    store = SQLiteSessionStore(str(tmp_path / 'sessions.db'))
+    connections = [store._connection()]
+    done, release = threading.Barrier(3), threading.Event()
+
+    def worker():
+        connections.append(store._connection())
+        done.wait()
+        release.wait()
+
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    done.wait()
+    store.close()
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute('SELECT 1')
@@ -0,0 +1,39 @@
+import json
+import logging
+import sys
+
+from structured_logging import JsonFormatter, new_request_id, request_id_var
+
+
+def format_record(message, exc_info=None, **extra):
+    record = logging.LogRecord('symptoseek', logging.INFO, __file__, 1, message, (), exc_info)
+    record.__dict__.update(extra)
+    return json.loads(JsonFormatter().format(record))
+
+
+def test_json_lines_carry_request_id_and_extras():
+    token = request_id_var.set('req-1')
+    try:
+        entry = format_record('POST /api/chat 200', route='/api/chat', duration_ms=1.5)
+    finally:
+        request_id_var.reset(token)
+    assert entry['message'] == 'POST /api/chat 200'
+    assert entry['level'] == 'INFO' and entry['logger'] == 'symptoseek'
+    assert entry['request_id'] == 'req-1'
+    assert entry['route'] == '/api/chat' and entry['duration_ms'] == 1.5
+    assert 'request_id' not in format_record('outside a request')
+
+
+def test_exceptions_are_included():
+    try:
+        raise RuntimeError('boom')
+    except RuntimeError:
+        entry = format_record('failed', exc_info=sys.exc_info())
+    assert 'RuntimeError: boom' in entry['exc_info']
+
+
+def test_upstream_request_ids_are_reused_when_sane():
+    assert new_request_id('abc-123') == 'abc-123'
+    assert new_request_id('x' * 500) != 'x' * 500
+    assert new_request_id('bad\nid') != 'bad\nid'
+    assert len(new_request_id()) == 32
@@ -0,0 +1,28 @@
+import numpy as np
+from symptom_encoder import SymptomEncoder
+
+FEATURES = ['abdominal pain', 'abdominal_pain', 'chest pain', 'Fever']
+
+
+def test_exact_names_and_aliases():
+    """Exact feature names win; other spellings fall back to the first normalized match"""
+    encoder = SymptomEncoder(FEATURES)
+    assert encoder.position('abdominal_pain') == 1
+    assert encoder.position('Abdominal Pain') == 0
+    assert encoder.canonical('chest_pain') == 'chest pain'
+    assert encoder.canonical('fever') == 'Fever'
+    assert encoder.position('rash') is None
+    assert 'CHEST-PAIN' in encoder
+
+
+def test_dense_and_sparse_batches_match():
+    """CSR and dense batch encodings hold the same rows and report unknown names"""
+    encoder = SymptomEncoder(FEATURES)
+    sets = [['fever', 'chest pain', 'fever'], [], ['rash', 'abdominal_pain']]
+
+    dense, unknown = encoder.encode_batch(sets)
+    sparse, _ = encoder.encode_batch(sets, sparse=True)
+    assert unknown == [[], [], ['rash']]
+    np.testing.assert_array_equal(sparse.toarray(), dense)
+    np.testing.assert_array_equal(dense[0], [0, 0, 1, 1])
+    np.testing.assert_array_equal(encoder.encode(sets[0]), dense[:1])
@@ -0,0 +1,32 @@
+from symptom_encoder import SymptomEncoder
+from symptom_extractor import SymptomExtractor, tokenize
+
+FEATURES = ['abdominal pain', 'abdominal_pain', 'pain', 'chest_pain', 'fatigue', 'high_fever', 'skin_rash']
+SYNONYMS = {
+    'fatigue': ['tired', 'worn out'],
+    'chest_pain': ["chest hurts", "can't breathe"],
+    'not_a_feature': ['whatever'],
+}
+
+
+def make_extractor():
+    return SymptomExtractor.build(FEATURES, SYNONYMS, SymptomEncoder(FEATURES))
+
+
+def test_tokenize_keeps_contractions():
+    assert tokenize("I can't Breathe, really!") == ['i', "can't", 'breathe', 'really']
+
+
+def test_features_and_synonyms_in_one_pass():
+    """Overlapping phrases are all reported, in order of appearance"""
+    extractor = make_extractor()
+    found = extractor.extract("My Abdominal Pain is bad, I'm worn out and I can't breathe")
+    assert found == ['abdominal_pain', 'pain', 'fatigue', 'chest_pain']
+    assert extractor.extract('high fever with a skin rash') == ['high_fever', 'skin_rash']
+
+
+def test_matches_respect_word_boundaries():
+    """Synonyms no longer fire inside longer words"""
+    extractor = make_extractor()
+    assert extractor.extract('I am retired') == []
+    assert extractor.extract('whatever') == []
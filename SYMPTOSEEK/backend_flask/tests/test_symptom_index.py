@@ -0,0 +1,30 @@
+import pandas as pd
+from symptom_index import SymptomCooccurrenceIndex
+
+SYMPTOMS = ['cough', 'fever', 'headache', 'rash']
+
+
+def make_training():
+    return pd.DataFrame([
+        [1, 1, 0, 0, 'flu'],
+        [1, 1, 1, 0, 'flu'],
+        [1, 0, 1, 0, 'cold'],
+        [1, 1, 0, 0, 'covid'],
+        [0, 0, 0, 1, 'allergy'],
+    ], columns=SYMPTOMS + ['prognosis'])
+
+
+def test_related_ranked_by_cooccurrence():
+    """Follow-ups are ordered by how often they appear with the symptom"""
+    index = SymptomCooccurrenceIndex.from_training(make_training(), SYMPTOMS)
+    assert index.related('cough') == ['fever', 'headache']
+    assert index.related('cough', exclude=['fever']) == ['headache']
+    assert index.related('rash') == []
+    assert index.related('not_a_symptom') == []
+
+
+def test_severity_weighting_reorders_candidates():
+    """A rarer but more severe symptom can outrank a frequent mild one"""
+    severity = pd.DataFrame({'Symptom': ['fever', 'headache'], 'Symptom_severity': [1, 5]})
+    index = SymptomCooccurrenceIndex.from_training(make_training(), SYMPTOMS, severity)
+    assert index.related('cough', k=1) == ['headache']
@@ -1,95 +1,219 @@
+import hmac
+import json
 import os
+import threading
+import time
 import joblib
 import pandas as pd
 from flask import Flask, request, jsonify
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import MultiLabelBinarizer
 
+from utils.symptom_encoder import SymptomEncoder
+
 app = Flask(__name__)
 
 # Path configuration
 MODEL_DIR = "models"
+MODEL_PATH = os.path.join(MODEL_DIR, "symptom_classifier.pkl")
+BINARIZER_PATH = os.path.join(MODEL_DIR, "symptom_binarizer.pkl")
+METADATA_PATH = os.path.join(MODEL_DIR, "disease_metadata.json")
 os.makedirs(MODEL_DIR, exist_ok=True)
 
 def load_and_preprocess_data():
-    """Load and preprocess the symptoms dataset"""
+    """Load and preprocess the symptoms dataset.
+
+    A row with a name but no symptoms is a category header that applies to
+    the disease rows below it, so categories are a forward fill over the
+    header rows and symptoms are the non-empty cells of each disease row.
+    """
     data_path = os.path.join(os.path.dirname(__file__), "Fydp_Works2.csv")
     df = pd.read_csv(data_path)
-    
-    diseases = []
-    current_category = ""
-    
-    for _, row in df.iterrows():
-        if pd.isna(row["Desease"]):
-            continue
-        if all(pd.isna(row[1:])):
-            current_category = row["Desease"]
-        else:
-            symptoms = [s.strip() for s in row[1:] if pd.notna(s)]
-            diseases.append({
-                "disease": row["Desease"],
-                "category": current_category,
-                "symptoms": symptoms
-            })
-    
-    return diseases
+    df = df[df["Desease"].notna()]
+    symptom_columns = df.columns[1:]
+
+    is_category = df[symptom_columns].isna().all(axis=1)
+    category = df["Desease"].where(is_category).ffill().fillna("")
+    rows = df[~is_category]
+
+    # Long format keeps each row's symptoms in column order after a stable sort
+    cells = rows[symptom_columns].melt(ignore_index=False, value_name="symptom").dropna(subset=["symptom"])
+    cells = cells.sort_index(kind="stable")
+    symptoms = cells["symptom"].astype(str).str.strip().groupby(level=0, sort=False).agg(list)
+
+    return [
+        {"disease": disease, "category": category_name, "symptoms": disease_symptoms}
+        for disease, category_name, disease_symptoms in zip(
+            rows["Desease"], category[~is_category], symptoms.reindex(rows.index)
+        )
+    ]
+
+def build_disease_metadata(diseases):
+    """Disease name -> category and symptom list, looked up by predicted class"""
+    return {d["disease"]: {"category": d["category"], "symptoms": d["symptoms"]} for d in diseases}
 
 def train_model():
-    """Train and save the ML model"""
+    """Train and save the ML model with its disease metadata table"""
     diseases = load_and_preprocess_data()
-    
+
     # Prepare features and labels
     mlb = MultiLabelBinarizer()
     X = mlb.fit_transform([d["symptoms"] for d in diseases])
     y = [d["disease"] for d in diseases]
-    
+
     # Train model
     model = RandomForestClassifier(n_estimators=200, random_state=42)
     model.fit(X, y)
-    
+    metadata = build_disease_metadata(diseases)
+
     # Save artifacts
-    joblib.dump(model, os.path.join(MODEL_DIR, "symptom_classifier.pkl"))
-    joblib.dump(mlb, os.path.join(MODEL_DIR, "symptom_binarizer.pkl"))
-    
-    return model, mlb
+    joblib.dump(model, MODEL_PATH)
+    joblib.dump(mlb, BINARIZER_PATH)
+    with open(METADATA_PATH, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+
+    return model, mlb, metadata
+
+def load_model():
+    """Load saved artifacts; the metadata table is rebuilt from the CSV if it predates it"""
+    model = joblib.load(MODEL_PATH)
+    mlb = joblib.load(BINARIZER_PATH)
+    if os.path.exists(METADATA_PATH):
+        with open(METADATA_PATH, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+    else:
+        metadata = build_disease_metadata(load_and_preprocess_data())
+        with open(METADATA_PATH, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2)
+    return model, mlb, metadata
+
+class ModelState:
+    """The serving model plus the status of the background training job.
+
+    The service starts without blocking on training; ``/predict`` answers 503
+    until a model is loaded or trained, and a retrain swaps the new model in
+    only once it is complete.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.bundle = None
+        self.status = "idle"
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._thread = None
+
+    def set_model(self, model, mlb, metadata):
+        # O(1) name -> column lookup that also accepts case/spacing variants of the
+        # binarizer's classes, which mlb.transform silently drops
+        self.bundle = (model, SymptomEncoder(mlb.classes_), metadata)
+
+    @property
+    def ready(self):
+        return self.bundle is not None
+
+    def start_training(self):
+        """Train in a background thread; False if a job is already running"""
+        with self._lock:
+            if self.status == "training":
+                return False
+            self.status, self.error = "training", None
+            self.started_at, self.finished_at = time.time(), None
+            self._thread = threading.Thread(target=self._train, name="model-training", daemon=True)
+            self._thread.start()
+            return True
+
+    def _train(self):
+        try:
+            print("Training new models...")
+            self.set_model(*train_model())
+            status, error = "ready", None
+            print("Training finished")
+        except Exception as e:
+            status, error = "failed", str(e)
+            print(f"Training failed: {e}")
+        with self._lock:
+            self.status, self.error, self.finished_at = status, error, time.time()
+
+    def wait(self, timeout=None):
+        """Block until the current training job finishes (used by tests and scripts)"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.ready
+
+    def describe(self):
+        return {
+            "status": self.status,
+            "model_ready": self.ready,
+            "error": self.error,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+state = ModelState()
 
 # Load or train model
 try:
-    model = joblib.load(os.path.join(MODEL_DIR, "symptom_classifier.pkl"))
-    mlb = joblib.load(os.path.join(MODEL_DIR, "symptom_binarizer.pkl"))
+    state.set_model(*load_model())
+    state.status = "ready"
     print("Loaded pre-trained models")
 except FileNotFoundError:
-    print("Training new models...")
-    model, mlb = train_model()
+    state.start_training()
 
 @app.route('/predict', methods=['POST'])
 def predict():
     """Prediction endpoint"""
     symptoms = request.json.get('symptoms', [])
-    
+
     if not symptoms:
         return jsonify({"error": "No symptoms provided"}), 400
-    
+
+    bundle = state.bundle
+    if bundle is None:
+        return jsonify({"error": "Model is not ready yet", "training": state.describe()}), 503
+    model, encoder, metadata = bundle
+
     try:
-        # Preprocess symptoms
-        processed_symptoms = [s.lower().strip() for s in symptoms]
-        
         # Transform to ML features
-        features = mlb.transform([processed_symptoms])
-        
+        features = encoder.encode(symptoms)
+
         # Get predictions
         proba = model.predict_proba(features)[0]
         best_idx = proba.argmax()
-        
+        disease = model.classes_[best_idx]
+        info = metadata.get(disease, {})
+
         return jsonify({
-            "predicted_disease": model.classes_[best_idx],
+            "predicted_disease": disease,
             "confidence": float(proba[best_idx]),
-            "category": diseases[best_idx]["category"],
+            "category": info.get("category", ""),
             "suggested_doctors": [],  # Will be filled by Node.js
-            "related_symptoms": diseases[best_idx]["symptoms"]
+            "related_symptoms": info.get("symptoms", [])
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def admin_authorized():
+    """Retraining requires X-Admin-Token to match MODEL_ADMIN_TOKEN; without a token it is disabled"""
+    token = os.getenv('MODEL_ADMIN_TOKEN')
+    return bool(token) and hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token)
+
+@app.route('/train', methods=['POST'])
+def retrain():
+    """Start a background retraining job"""
+    if not os.getenv('MODEL_ADMIN_TOKEN'):
+        return jsonify({"error": "Retraining is disabled; set MODEL_ADMIN_TOKEN to enable it"}), 403
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    if not state.start_training():
+        return jsonify({"error": "Training already in progress", "training": state.describe()}), 409
+    return jsonify(state.describe()), 202
+
+@app.route('/train/status', methods=['GET'])
+def training_status():
+    return jsonify(state.describe())
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5001)
@@ -1,8 +1,13 @@
 import pytest
-from app import app, model, mlb
+from app import app, state
 import joblib
 import numpy as np
 
+@pytest.fixture(scope="module", autouse=True)
+def trained_model():
+    """Training runs in the background at import; wait for it"""
+    assert state.wait(timeout=120), state.describe()
+
 @pytest.fixture
 def client():
     app.config['TESTING'] = True
@@ -30,13 +35,43 @@ def test_prediction_endpoint(client):
     assert "predicted_disease" in data
     assert "confidence" in data
     assert data["confidence"] > 0  # Confidence should be positive
+    assert data["category"]
+    assert data["related_symptoms"]
 
     # Test with empty symptoms
     response = client.post('/predict', json={"symptoms": []})
     assert response.status_code == 400
 
+def test_predict_waits_for_model(client, monkeypatch):
+    """Requests get 503 instead of blocking while no model is loaded"""
+    monkeypatch.setattr(state, "bundle", None)
+    response = client.post('/predict', json={"symptoms": ["fever"]})
+    assert response.status_code == 503
+    assert response.get_json()["training"]["model_ready"] is False
+
+def test_training_status(client):
+    response = client.get('/train/status')
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "ready"
+
+def test_retrain_requires_admin_token(client, monkeypatch):
+    """Retraining is CPU-heavy, so it is off without a token and refused with a wrong one"""
+    monkeypatch.delenv("MODEL_ADMIN_TOKEN", raising=False)
+    assert client.post('/train').status_code == 403
+
+    monkeypatch.setenv("MODEL_ADMIN_TOKEN", "secret")
+    assert client.post('/train').status_code == 401
+    assert client.post('/train', headers={"X-Admin-Token": "wrong"}).status_code == 401
+
+    started = []
+    monkeypatch.setattr(state, "start_training", lambda: started.append(1) or True)
+    response = client.post('/train', headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 202
+    assert started == [1]
+
 def test_model_accuracy():
     """Test model accuracy with known samples"""
+    model, encoder, _ = state.bundle
     # Get some known disease-symptom pairs from your CSV
     test_cases = [
         (["fever", "cough", "chest pain"], "Pneumonia"),
@@ -44,6 +79,6 @@ def test_model_accuracy():
     ]
     
     for symptoms, expected_disease in test_cases:
-        features = mlb.transform([symptoms])
+        features = encoder.encode(symptoms)
         prediction = model.predict(features)[0]
-        assert prediction == expected_disease
\ No newline at end of file
+        assert prediction == expected_disease
@@ -0,0 +1,83 @@
+# Vendored from backend_flask/symptom_encoder.py so this service builds and runs on its own;
+# keep the two copies in sync.
+import re
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+_SEPARATORS = re.compile(r'[\s_\-]+')
+
+
+def normalize_symptom(name):
+    """Case-fold a symptom name and collapse spaces, underscores and hyphens"""
+    return _SEPARATORS.sub(' ', str(name).strip().lower())
+
+
+class SymptomEncoder:
+    """Maps symptom names to model feature columns in O(1).
+
+    Exact feature names always win; every other spelling that normalizes to
+    the same text (``"Abdominal Pain"``, ``"abdominal_pain"``) is accepted as
+    an alias of the first feature with that normalized form. The compact
+    encoding of a symptom set is its sorted array of column indices, from
+    which dense rows or a CSR matrix are built for the classifier.
+    """
+
+    def __init__(self, features):
+        self.features = list(features)
+        self.positions = {feature: i for i, feature in enumerate(self.features)}
+        self.aliases = {}
+        for i, feature in enumerate(self.features):
+            self.aliases.setdefault(normalize_symptom(feature), i)
+
+    def __len__(self):
+        return len(self.features)
+
+    def __contains__(self, name):
+        return self.position(name) is not None
+
+    def position(self, name):
+        """Column index for a symptom name or alias, or None if unknown"""
+        position = self.positions.get(name)
+        if position is None:
+            position = self.aliases.get(normalize_symptom(name))
+        return position
+
+    def canonical(self, name):
+        """Feature name a symptom resolves to, or None if unknown"""
+        position = self.position(name)
+        return self.features[position] if position is not None else None
+
+    def indices(self, symptoms):
+        """Compact encoding: ``(sorted unique column indices, unknown names)``"""
+        known = set()
+        unknown = []
+        for symptom in symptoms:
+            position = self.position(symptom)
+            if position is None:
+                unknown.append(symptom)
+            else:
+                known.add(position)
+        return np.array(sorted(known), dtype=np.intp), unknown
+
+    def encode(self, symptoms, dtype=np.float32):
+        """Dense ``(1, n_features)`` row for one symptom set"""
+        row = np.zeros((1, len(self.features)), dtype=dtype)
+        row[0, self.indices(symptoms)[0]] = 1
+        return row
+
+    def encode_batch(self, symptom_sets, sparse=False, dtype=np.float32):
+        """Encode many symptom sets; returns ``(matrix, unknown names per set)``"""
+        encoded = [self.indices(symptoms) for symptoms in symptom_sets]
+        unknown = [missing for _, missing in encoded]
+        if sparse:
+            indptr = np.zeros(len(encoded) + 1, dtype=np.intp)
+            np.cumsum([len(columns) for columns, _ in encoded], out=indptr[1:])
+            columns = np.concatenate([c for c, _ in encoded]) if encoded else np.empty(0, dtype=np.intp)
+            data = np.ones(len(columns), dtype=dtype)
+            return csr_matrix((data, columns, indptr), shape=(len(encoded), len(self.features))), unknown
+
+        matrix = np.zeros((len(encoded), len(self.features)), dtype=dtype)
+        for row, (columns, _) in enumerate(encoded):
+            matrix[row, columns] = 1
+        return matrix, unknown